@@ -0,0 +1,167 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from src.models.registry import ModelRegistry
+
+
+class QueueFull(Exception):
+    """The inference executor has no free slot; the API answers 429."""
+
+
+class InferenceTimeout(Exception):
+    """A request waited longer than the executor timeout; the API answers 504."""
+
+
+# ---- task functions (module level so process workers can unpickle them)
+_REGISTRY = None
+
+
+def _init_worker(artifacts_dir, names, mmap):
+    # process workers load (memory-map) every model once, before taking tasks
+    global _REGISTRY
+    _REGISTRY = ModelRegistry(artifacts_dir, names, mmap=mmap, n_jobs=1)
+    _REGISTRY.warm_up(background=False)
+
+
+def predict_rows_task(name, rows):
+    """Vehicle dicts -> predictions (single-vehicle endpoints, micro-batches)."""
+    return _REGISTRY.get(name).predict_rows(rows)
+
+
+def predict_frame_task(name, X):
+    """DataFrame -> predictions (batch endpoints)."""
+    return _REGISTRY.get(name).predict(X)
+
+
+def predict_interval_rows_task(name, rows):
+    """Vehicle dicts -> (mean, std, P10/P90) from the per-tree spread."""
+    return _REGISTRY.get(name).predict_interval_rows(rows)
+
+
+def predict_interval_frame_task(name, X):
+    """DataFrame -> (mean, std, P10/P90) from the per-tree spread."""
+    return _REGISTRY.get(name).predict_interval(X)
+
+
+def attribute_rows_task(name, rows):
+    """Vehicle dicts -> (bias, per-feature decision-path attributions)."""
+    return _REGISTRY.get(name).attribute_rows(rows)
+
+
+def attribute_frame_task(name, X):
+    """DataFrame -> (bias, per-feature decision-path attributions)."""
+    return _REGISTRY.get(name).attribute(X)
+
+
+class InferenceExecutor:
+    """
+    Runs model calls on a dedicated, bounded worker pool instead of the
+    event loop or FastAPI's shared threadpool.
+
+    kind="thread":  `workers` threads sharing the API's registry; forests are
+                    pinned to n_jobs=1 so concurrent calls do not each start
+                    a joblib pool (no core oversubscription).
+    kind="process": `workers` processes, each loading the models once (the
+                    .flat/ arrays are memory-mapped, so shared).
+
+    At most `workers + queue_size` calls are running or queued; beyond that
+    submit raises QueueFull. A caller waiting longer than `timeout_s` gets
+    InferenceTimeout (a call that has not started yet is cancelled).
+    """
+
+    def __init__(self, registry, kind="thread", workers=1, queue_size=32, timeout_s=10.0):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor kind: {kind}")
+        self.registry = registry
+        self.kind = kind
+        self.workers = max(1, int(workers))
+        self.max_pending = self.workers + int(queue_size)
+        self.timeout_s = float(timeout_s)
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        # the API process has running threads; spawn instead of fork
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self.registry.artifacts_dir, self.registry.names, self.registry.mmap)
+                    )
+                else:
+                    global _REGISTRY
+                    _REGISTRY = self.registry
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+            return self._pool
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+            if not future.cancelled():
+                self.completed += 1
+
+    def submit(self, fn, *args):
+        pool = self._get_pool()
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f"Inference queue full ({self.max_pending} calls pending).")
+            self.pending += 1
+        try:
+            future = pool.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _timed_out(self, future):
+        future.cancel()
+        with self._lock:
+            self.timeouts += 1
+        return InferenceTimeout(f"Inference did not finish within {self.timeout_s:g}s.")
+
+    async def run(self, fn, *args):
+        """Submit and await (for async endpoints)."""
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout_s)
+        except asyncio.TimeoutError:
+            raise self._timed_out(future) from None
+
+    def run_sync(self, fn, *args):
+        """Submit and block (for sync endpoints running in FastAPI's threadpool)."""
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout_s)
+        except FutureTimeout:
+            raise self._timed_out(future) from None
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
@@ -1,18 +1,208 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import joblib
 from pathlib import Path
-import pandas as pd
 from src.risk.risk_scoring import risk_category_from_co2, risk_score_from_co2, generate_reasons
-from src.risk.risk_scoring import fleet_compliance_summary
-
+from src.risk.risk_scoring import (
+    risk_category_from_co2_array, risk_score_from_co2_array, generate_reasons_batch
+)
+from src.risk.risk_scoring import fleet_compliance_summary, FleetComplianceAggregator, EU_TARGETS
+from src.risk.risk_scoring import compliance_sweep, reasons_from_attributions
+from src.models.prediction_cache import PredictionCache, lookup_cached, row_key
+from src.models.registry import ModelRegistry
+from src.config import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CATALOG_LOOKUP, MAX_FLEET_SESSIONS, MODEL_MMAP
+from src.config import FLEET_SESSION_TTL_SECONDS
+from src.config import MODEL_WARMUP, PROFILE_EVERY_N, PROFILE_DIR, STRICT_MODEL, FULL_MODEL
+from src.config import MICRO_BATCH, MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_MS, MICRO_BATCH_MAX_QUEUE
+from src.config import INFERENCE_EXECUTOR, INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE, INFERENCE_TIMEOUT_S
+from src.utils.metrics import RequestMetrics, MetricsMiddleware, stage
+from api.micro_batcher import MicroBatcher
+from api.inference_executor import (
+    InferenceExecutor, QueueFull, InferenceTimeout, predict_rows_task, predict_frame_task,
+    predict_interval_rows_task, predict_interval_frame_task, attribute_rows_task, attribute_frame_task
+)
 
-app = FastAPI(title="CO2 Risk & Compliance API", version="1.0")
+logger = logging.getLogger(__name__)
 
-# Load models once at startup (industrial practice)
+# Models are loaded lazily by the registry (pandas/sklearn are only imported then),
+# so the process answers /health immediately; /ready reports when models are loaded.
 ARTIFACTS = Path("artifacts/models")
-STRICT_MODEL = joblib.load(ARTIFACTS / "rf_strict_v1.joblib")
-FULL_MODEL = joblib.load(ARTIFACTS / "rf_full_v1.joblib")
+STRICT_NAME = STRICT_MODEL
+FULL_NAME = FULL_MODEL
+REGISTRY = ModelRegistry(ARTIFACTS, [STRICT_NAME, FULL_NAME], mmap=MODEL_MMAP, n_jobs=1)
+
+# All model calls run on this bounded pool (429 when full, 504 after INFERENCE_TIMEOUT_S)
+EXECUTOR = InferenceExecutor(
+    REGISTRY,
+    kind=INFERENCE_EXECUTOR,
+    workers=INFERENCE_WORKERS,
+    queue_size=INFERENCE_QUEUE_SIZE,
+    timeout_s=INFERENCE_TIMEOUT_S
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MODEL_WARMUP:
+        REGISTRY.warm_up(background=True)   # server accepts connections while this runs
+    yield
+    EXECUTOR.shutdown()
+
+
+app = FastAPI(title="CO2 Risk & Compliance API", version="1.0", lifespan=lifespan)
+
+# Per-endpoint request/stage latency histograms (GET /metrics, Prometheus text format)
+# and a sampling profiler (every CO2_PROFILE_EVERY_N-th instrumented request, 0 = off)
+METRICS = RequestMetrics(profile_every=PROFILE_EVERY_N, profile_dir=PROFILE_DIR)
+app.add_middleware(MetricsMiddleware, metrics=METRICS)
+
+
+@app.exception_handler(QueueFull)
+async def queue_full_handler(request, exc):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(InferenceTimeout)
+async def inference_timeout_handler(request, exc):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+# Repeated vehicle specs are answered from an LRU/TTL cache
+STRICT_CACHE = PredictionCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+FULL_CACHE = PredictionCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+# Concurrent single-vehicle requests that miss the caches are coalesced into one
+# forest call per model (up to MICRO_BATCH_MAX_SIZE rows / MICRO_BATCH_MAX_WAIT_MS)
+BATCHERS = {
+    name: MicroBatcher(
+        lambda rows, name=name: EXECUTOR.run(predict_rows_task, name, rows),
+        max_batch_size=MICRO_BATCH_MAX_SIZE,
+        max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+        max_queue=MICRO_BATCH_MAX_QUEUE
+    )
+    for name in [STRICT_NAME, FULL_NAME]
+}
+
+# Batch endpoints: hard cap per request + rows serialized per streamed chunk
+MAX_BATCH_SIZE = 10_000
+STREAM_CHUNK_ROWS = 500
+
+
+# (mode, content_hash) pairs already warned about a stale catalog table
+CATALOG_MISMATCH_WARNED = set()
+
+
+@lru_cache(maxsize=None)
+def catalog_table():
+    """Catalog lookup mode: the precomputed table, loaded on first use (None if absent/disabled)."""
+    if not CATALOG_LOOKUP:
+        return None
+    from src.models.catalog_table import load_catalog_table
+    return load_catalog_table(ARTIFACTS / "catalog_predictions_v1.npz")
+
+
+def catalog_for(mode: str, model):
+    # only use the table if it was built from the model being served
+    table = catalog_table()
+    if table is None:
+        return None
+    if table.matches(mode, model):
+        return table
+    key = (mode, getattr(model, "content_hash", None))
+    if key not in CATALOG_MISMATCH_WARNED:
+        CATALOG_MISMATCH_WARNED.add(key)
+        logger.warning(
+            "Catalog table was not built from the served %s model (%s); using live inference. "
+            "Rebuild it with: python -m src.models.catalog_table", mode, model.version
+        )
+    return None
+
+
+async def get_model(name: str):
+    # a first (blocking) load must not stall the event loop
+    if REGISTRY.is_loaded(name):
+        return REGISTRY.get(name)
+    return await run_in_threadpool(REGISTRY.get, name)
+
+
+async def predict_one(name: str, cache: PredictionCache, row: dict, mode: str):
+    """Catalog -> cache -> model (micro-batched, or one executor call) on the raw row. Returns co2_pred."""
+    model = await get_model(name)
+    co2_pred, key = lookup_cached(cache, model, row, mode, catalog_for(mode, model))
+    if co2_pred is None:
+        if MICRO_BATCH:
+            with stage("batch"):
+                try:
+                    co2_pred = await asyncio.wait_for(BATCHERS[name].predict(row), EXECUTOR.timeout_s)
+                except asyncio.TimeoutError:
+                    raise InferenceTimeout(f"Inference did not finish within {EXECUTOR.timeout_s:g}s.") from None
+        else:
+            with stage("inference"):
+                co2_pred = float((await EXECUTOR.run(predict_rows_task, name, [row]))[0])
+        if key is not None:
+            cache.put(key, co2_pred, model.version)
+    return co2_pred
+
+
+def require_forest(name: str, model, what: str):
+    if not model.is_forest:
+        raise HTTPException(status_code=400, detail=f"Model {name} is not a forest ({what} need one).")
+
+
+def interval_fields(std, q) -> dict:
+    return {"std": round(float(std), 2), "p10": round(float(q[0]), 2), "p90": round(float(q[1]), 2)}
+
+
+async def predict_one_interval(name: str, row: dict, mode: str):
+    """
+    One executor call for the prediction and its per-tree spread (not cached;
+    the mean is the same value predict_one returns). Returns (co2_pred, interval).
+    """
+    model = await get_model(name)
+    require_forest(name, model, "intervals")
+    with stage("inference"):
+        mean, std, q = await EXECUTOR.run(predict_interval_rows_task, name, [row])
+    return float(mean[0]), interval_fields(std[0], q[0])
+
+
+async def predict_vehicle(name: str, cache: PredictionCache, row: dict, mode: str, interval: bool):
+    """predict_one, or predict_one_interval when the client asked for the interval."""
+    if interval:
+        return await predict_one_interval(name, row, mode)
+    return await predict_one(name, cache, row, mode), None
+
+
+def attribution_fields(bias, contributions: dict) -> dict:
+    return {"bias_g_km": round(float(bias), 2), "features": {f: round(float(v), 2) for f, v in contributions.items()}}
+
+
+async def explain_one(name: str, row: dict, mode: str):
+    """
+    (bias, {feature: g/km}) for a raw row: precomputed for catalog specs,
+    else one decision-path pass on the executor (about a millisecond per vehicle).
+    """
+    model = await get_model(name)
+    require_forest(name, model, "attributions")
+    table = catalog_for(mode, model)
+    if table is not None:
+        key = row_key(row, mode)
+        i = table.find(key, mode) if key is not None else None
+        stored = table.attributions(i, mode) if i is not None else None
+        if stored is not None:
+            return stored
+    with stage("inference"):
+        bias, contrib = await EXECUTOR.run(attribute_rows_task, name, [row])
+    return bias, dict(zip(model.input_features, contrib[0].tolist()))
 
 
 class StrictInput(BaseModel):
@@ -47,43 +237,197 @@ def to_full_df(payload: FullInput):
 
 @app.get("/health")
 def health():
+    # liveness: never waits for models
     return {"status": "ok"}
 
 
-@app.post("/predict/strict")
-def predict_strict(payload: StrictInput, limit: float = 200.0):
-    row = to_strict_df(payload)
+@app.get("/ready")
+def ready():
+    # readiness: 200 once every model is loaded, 503 while warming up
+    models = REGISTRY.status()
+    if not REGISTRY.is_ready():
+        return JSONResponse(status_code=503, content={"status": "loading", "models": models})
+    return {"status": "ready", "models": models}
+
 
-    X = pd.DataFrame([row])     # 1-row table
-    co2_pred = float(STRICT_MODEL.predict(X)[0])
+@app.get("/metrics")
+def metrics():
+    lines = [METRICS.render()]
+    for name, batcher in BATCHERS.items():
+        stats = batcher.stats()
+        lines.append(f'co2_microbatch_batches_total{{model="{name}"}} {stats["batches"]}\n')
+        lines.append(f'co2_microbatch_rows_total{{model="{name}"}} {stats["rows"]}\n')
+    stats = EXECUTOR.stats()
+    for key in ["pending", "completed", "rejected", "timeouts"]:
+        lines.append(f'co2_inference_{key}{"" if key == "pending" else "_total"}{{kind="{stats["kind"]}"}} {stats[key]}\n')
+    return PlainTextResponse("".join(lines), media_type="text/plain; version=0.0.4")
 
 
+@app.get("/metrics/cache")
+def cache_metrics():
     return {
-        "model": "rf_strict_v1",
+        STRICT_NAME: STRICT_CACHE.stats(),
+        FULL_NAME: FULL_CACHE.stats(),
+        "catalog": catalog_table().stats() if catalog_table() is not None else None
+    }
+
+
+@app.post("/predict/strict")
+@METRICS.instrument
+async def predict_strict(payload: StrictInput, limit: float = 200.0, interval: bool = False, explain: bool = False):
+    row = to_strict_df(payload)
+    co2_pred, spread = await predict_vehicle(STRICT_NAME, STRICT_CACHE, row, "STRICT", interval)
+
+    with stage("risk"):
+        risk_score = risk_score_from_co2(co2_pred, limit)
+        compliance = risk_category_from_co2(co2_pred, limit)
+    if explain:
+        bias, contributions = await explain_one(STRICT_NAME, row, "STRICT")
+        with stage("reasons"):
+            reasons = reasons_from_attributions(row, contributions)
+    else:
+        with stage("reasons"):
+            reasons = generate_reasons(row, mode="STRICT")
+
+    response = {
+        "model": STRICT_NAME,
         "co2_pred_g_km": round(co2_pred, 2),
-        "risk_score": risk_score_from_co2(co2_pred, limit),
-        "compliance": risk_category_from_co2(co2_pred, limit),
-        "reasons": generate_reasons(row, mode="STRICT"),
+        "risk_score": risk_score,
+        "compliance": compliance,
+        "reasons": reasons,
         "limit_g_km": limit
     }
+    if spread is not None:
+        response["interval"] = spread
+    if explain:
+        response["attributions"] = attribution_fields(bias, contributions)
+    return response
 
 
 @app.post("/predict/full")
-def predict_full(payload: FullInput, limit: float = 200.0):
+@METRICS.instrument
+async def predict_full(payload: FullInput, limit: float = 200.0, interval: bool = False, explain: bool = False):
     row = to_full_df(payload)
-    X = pd.DataFrame([row])   # 1-row DataFrame (2D)
-    co2_pred = float(FULL_MODEL.predict(X)[0])
+    co2_pred, spread = await predict_vehicle(FULL_NAME, FULL_CACHE, row, "FULL", interval)
 
-    return {
-        "model": "rf_full_v1",
+    with stage("risk"):
+        risk_score = risk_score_from_co2(co2_pred, limit)
+        compliance = risk_category_from_co2(co2_pred, limit)
+    if explain:
+        bias, contributions = await explain_one(FULL_NAME, row, "FULL")
+        with stage("reasons"):
+            reasons = reasons_from_attributions(row, contributions)
+    else:
+        with stage("reasons"):
+            reasons = generate_reasons(row, mode="FULL")
+
+    response = {
+        "model": FULL_NAME,
         "co2_pred_g_km": round(co2_pred, 2),
-        "risk_score": risk_score_from_co2(co2_pred, limit),
-        "compliance": risk_category_from_co2(co2_pred, limit),
-        "reasons": generate_reasons(row, mode="FULL"),
+        "risk_score": risk_score,
+        "compliance": compliance,
+        "reasons": reasons,
         "limit_g_km": limit
     }
+    if spread is not None:
+        response["interval"] = spread
+    if explain:
+        response["attributions"] = attribution_fields(bias, contributions)
+    return response
+
+def stream_batch_results(model_name, rows, preds, mode: str, limit: float, spread=None, attributions=None):
+    """
+    Yields the batch response as JSON text, STREAM_CHUNK_ROWS rows at a time,
+    so the full response body is never held in memory. `spread` is the
+    (std, quantiles) pair of predict_interval, added to each result as "interval";
+    `attributions` is (bias, contrib, features) from attribute(), added as
+    "attributions" with reasons derived from them.
+    """
+    with stage("risk"):
+        scores = risk_score_from_co2_array(preds, limit)
+        decisions = risk_category_from_co2_array(preds, limit)
+
+    yield json.dumps({"model": model_name, "limit_g_km": limit, "count": len(preds)})[:-1]
+    yield ', "results": ['
+
+    for start in range(0, len(preds), STREAM_CHUNK_ROWS):
+        stop = start + STREAM_CHUNK_ROWS
+        with stage("reasons"):
+            if attributions is None:
+                reasons = generate_reasons_batch(rows.iloc[start:stop], mode=mode)
+            else:
+                bias, contrib, features = attributions
+                explained = [dict(zip(features, c)) for c in contrib[start:stop].tolist()]
+                chunk = rows.iloc[start:stop].to_dict("records")
+                reasons = [reasons_from_attributions(r, e) for r, e in zip(chunk, explained)]
+        items = []
+        for i, (p, s, c, r) in enumerate(zip(preds[start:stop], scores[start:stop], decisions[start:stop], reasons)):
+            item = {
+                "co2_pred_g_km": round(float(p), 2),
+                "risk_score": float(s),
+                "compliance": str(c),
+                "reasons": r
+            }
+            if spread is not None:
+                item["interval"] = interval_fields(spread[0][start + i], spread[1][start + i])
+            if attributions is not None:
+                item["attributions"] = attribution_fields(bias, explained[i])
+            items.append(json.dumps(item))
+        yield ("," if start else "") + ",".join(items)
+
+    yield "]}"
+
+
+def predict_batch(model_name, rows: list, mode: str, limit: float, interval: bool = False, explain: bool = False):
+    if not rows:
+        raise HTTPException(status_code=422, detail="Batch must contain at least one vehicle.")
+    if len(rows) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(rows)} vehicles (max {MAX_BATCH_SIZE} per request)."
+        )
+
+    import pandas as pd
+
+    with stage("dataframe"):
+        X = pd.DataFrame(rows)
+    model = REGISTRY.get(model_name)    # load (or raise) here, not inside the executor
+    if interval:
+        require_forest(model_name, model, "intervals")
+    if explain:
+        require_forest(model_name, model, "attributions")
+
+    spread = attributions = None
+    with stage("inference"):    # preprocess + forest on the executor
+        if interval:
+            preds, std, q = EXECUTOR.run_sync(predict_interval_frame_task, model_name, X)
+            spread = (std, q)
+        else:
+            preds = EXECUTOR.run_sync(predict_frame_task, model_name, X)    # one predict call for the whole batch
+        if explain:
+            # decision-path pass over all rows at once (linear in batch size)
+            bias, contrib = EXECUTOR.run_sync(attribute_frame_task, model_name, X)
+            attributions = (bias, contrib, model.input_features)
+
+    return StreamingResponse(
+        stream_batch_results(model_name, X, preds, mode, limit, spread, attributions),
+        media_type="application/json"
+    )
+
+
+@app.post("/predict/strict/batch")
+@METRICS.instrument
+def predict_strict_batch(payload: List[StrictInput], limit: float = 200.0, interval: bool = False, explain: bool = False):
+    rows = [to_strict_df(p) for p in payload]
+    return predict_batch(STRICT_NAME, rows, mode="STRICT", limit=limit, interval=interval, explain=explain)
+
+
+@app.post("/predict/full/batch")
+@METRICS.instrument
+def predict_full_batch(payload: List[FullInput], limit: float = 200.0, interval: bool = False, explain: bool = False):
+    rows = [to_full_df(p) for p in payload]
+    return predict_batch(FULL_NAME, rows, mode="FULL", limit=limit, interval=interval, explain=explain)
 
-from typing import List
 
 class FleetCO2Input(BaseModel):
     co2_predictions: List[float]
@@ -91,8 +435,132 @@ class FleetCO2Input(BaseModel):
 
 
 @app.post("/fleet/compliance")
+@METRICS.instrument
 def fleet_compliance(payload: FleetCO2Input):
     return fleet_compliance_summary(
         co2_values=payload.co2_predictions,
         policy_key=payload.policy
     )
+
+
+class FleetSweepInput(BaseModel):
+    co2_predictions: List[float]
+    limits: List[float]                     # vehicle risk limits to evaluate (g/km)
+    policies: Optional[List[str]] = None    # default: every EU_TARGETS key
+
+
+@app.post("/fleet/sweep")
+@METRICS.instrument
+def fleet_sweep(payload: FleetSweepInput):
+    unknown = [p for p in (payload.policies or []) if p not in EU_TARGETS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown policies: {unknown}")
+    if not payload.co2_predictions:
+        raise HTTPException(status_code=422, detail="co2_predictions must not be empty.")
+    return compliance_sweep(payload.co2_predictions, payload.limits, payload.policies)
+
+
+# ---- Fleet compliance sessions: submit a large fleet in chunks, then finalize
+# Sessions live in this process's memory, so run the API with a single worker
+# (uvicorn --workers 1) or route every request of a session to the same worker;
+# a chunk that lands on another worker gets 404.
+FLEET_SESSIONS = {}
+FLEET_SESSIONS_LOCK = threading.Lock()
+
+
+class FleetSession:
+    """A FleetComplianceAggregator plus its own lock and last-activity time."""
+
+    def __init__(self):
+        self.aggregator = FleetComplianceAggregator()
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.closed = False
+
+    def expired(self, now: float) -> bool:
+        return bool(FLEET_SESSION_TTL_SECONDS) and now - self.last_used > FLEET_SESSION_TTL_SECONDS
+
+
+class FleetChunkInput(BaseModel):
+    co2_predictions: List[float]
+    makes: Optional[List[str]] = None            # optional, for per-Make breakdown
+    vehicle_classes: Optional[List[str]] = None  # optional, for per-class breakdown
+
+
+def evict_expired_fleet_sessions(now: float):
+    """Drop idle sessions; caller holds FLEET_SESSIONS_LOCK."""
+    for session_id in [k for k, session in FLEET_SESSIONS.items() if session.expired(now)]:
+        del FLEET_SESSIONS[session_id]
+
+
+def get_fleet_session(session_id: str) -> FleetSession:
+    now = time.monotonic()
+    with FLEET_SESSIONS_LOCK:
+        session = FLEET_SESSIONS.get(session_id)
+        if session is not None and session.expired(now):
+            del FLEET_SESSIONS[session_id]
+            session = None
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown fleet session: {session_id}")
+    return session
+
+
+def unknown_fleet_session(session_id: str):
+    # finalized by a concurrent request after get_fleet_session returned
+    return HTTPException(status_code=404, detail=f"Unknown fleet session: {session_id}")
+
+
+@app.post("/fleet/sessions")
+@METRICS.instrument
+def create_fleet_session():
+    with FLEET_SESSIONS_LOCK:
+        evict_expired_fleet_sessions(time.monotonic())
+        if len(FLEET_SESSIONS) >= MAX_FLEET_SESSIONS:
+            raise HTTPException(status_code=429, detail="Too many open fleet sessions.")
+        session_id = uuid.uuid4().hex
+        FLEET_SESSIONS[session_id] = FleetSession()
+    return {"session_id": session_id}
+
+
+@app.post("/fleet/sessions/{session_id}/chunks")
+@METRICS.instrument
+def add_fleet_chunk(session_id: str, payload: FleetChunkInput):
+    session = get_fleet_session(session_id)
+    with session.lock:
+        if session.closed:
+            raise unknown_fleet_session(session_id)
+        try:
+            session.aggregator.update(payload.co2_predictions, payload.makes, payload.vehicle_classes)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        session.last_used = time.monotonic()
+        vehicles = session.aggregator.count
+    return {"session_id": session_id, "vehicles": vehicles}
+
+
+@app.post("/fleet/sessions/{session_id}/finalize")
+@METRICS.instrument
+def finalize_fleet_session(session_id: str, policy: str, breakdown: bool = False):
+    if policy not in EU_TARGETS:
+        raise HTTPException(status_code=422, detail=f"Unknown policy: {policy}")
+    session = get_fleet_session(session_id)
+
+    # summarise under the session lock, so a chunk either makes it into the
+    # result or gets 404 - never 200 and then dropped
+    with session.lock:
+        if session.closed:
+            raise unknown_fleet_session(session_id)
+        aggregator = session.aggregator
+        if aggregator.count == 0:
+            raise HTTPException(status_code=422, detail="Fleet session has no CO2 values.")
+
+        result = aggregator.summary(policy)
+        result["vehicles"] = aggregator.count
+        if breakdown:
+            result["by_make"] = aggregator.breakdown(policy, by="Make")
+            result["by_vehicle_class"] = aggregator.breakdown(policy, by="Vehicle Class")
+        session.closed = True
+
+    with FLEET_SESSIONS_LOCK:
+        FLEET_SESSIONS.pop(session_id, None)
+    return result
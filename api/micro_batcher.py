@@ -0,0 +1,96 @@
+import asyncio
+import contextvars
+
+from api.inference_executor import QueueFull
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-vehicle predictions into one model call.
+
+    predict(row) queues the row and awaits its future. One background task per
+    event loop takes the first waiting row, waits up to `max_wait_ms` for more
+    (or until `max_batch_size` rows are queued), awaits `predict_many(rows)`
+    once (a coroutine, e.g. the inference executor) and resolves every future
+    with its own prediction. While a batch is running the next requests queue
+    up, so under load batches fill without waiting.
+
+    More than `max_queue` waiting rows raises QueueFull (backpressure).
+    """
+
+    def __init__(self, predict_many, max_batch_size=64, max_wait_ms=2.0, max_queue=1024):
+        self.predict_many = predict_many
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = float(max_wait_ms) / 1000
+        self.max_queue = int(max_queue)
+        self._loop = None
+        self._queue = None
+        self._full = None
+        self._task = None
+
+        self.batches = 0
+        self.rows = 0
+
+    def _start(self, loop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        # empty context: the worker must not inherit (and time stages into) the first request's context
+        self._task = loop.create_task(self._run(), context=contextvars.Context())
+
+    async def predict(self, row: dict) -> float:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task.done():
+            self._start(loop)
+
+        if self._queue.qsize() >= self.max_queue:
+            raise QueueFull(f"Micro-batch queue full ({self.max_queue} rows waiting).")
+        future = loop.create_future()
+        self._queue.put_nowait((row, future))
+        if self._queue.qsize() >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    def _take(self, batch):
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            self._take(batch)
+
+            if len(batch) < self.max_batch_size and self.max_wait > 0:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+                self._take(batch)
+
+            batch = [(row, future) for row, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+
+            try:
+                preds = await self.predict_many([row for row, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), pred in zip(batch, preds):
+                if not future.done():
+                    future.set_result(float(pred))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as main
+from api.inference_executor import InferenceExecutor, InferenceTimeout, QueueFull
+
+VEHICLE = {
+    "Make": "ACURA", "Vehicle_Class": "COMPACT", "Transmission": "AS5", "Fuel_Type": "Z",
+    "Engine_Size_L": 2.0, "Cylinders": 4
+}
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def blocked_call(release: threading.Event):
+    release.wait(5)
+    return "done"
+
+
+def test_queue_full_and_timeout_release_slots():
+    executor = InferenceExecutor(registry=None, kind="thread", workers=1, queue_size=1, timeout_s=0.2)
+    release = threading.Event()
+    try:
+        running = executor.submit(blocked_call, release)
+
+        # a queued call that times out is cancelled and frees its slot at once
+        with pytest.raises(InferenceTimeout):
+            executor.run_sync(blocked_call, release)
+        wait_until(lambda: executor.pending == 1)
+        assert executor.stats()["timeouts"] == 1
+
+        queued = executor.submit(blocked_call, release)
+        with pytest.raises(QueueFull):
+            executor.submit(blocked_call, release)
+        assert executor.stats()["rejected"] == 1
+
+        # the running call keeps its slot until it actually finishes
+        release.set()
+        assert running.result(timeout=5) == queued.result(timeout=5) == "done"
+        wait_until(lambda: executor.pending == 0)
+        assert executor.run_sync(blocked_call, release) == "done"
+    finally:
+        executor.shutdown()
+
+
+class LoadedModel:
+    is_forest = True
+
+
+class LoadedRegistry:
+    def get(self, name):
+        return LoadedModel()
+
+
+def test_api_answers_429_and_504(monkeypatch):
+    executor = InferenceExecutor(registry=None, kind="thread", workers=1, queue_size=0, timeout_s=0.2)
+    release = threading.Event()
+    monkeypatch.setattr(main, "EXECUTOR", executor)
+    monkeypatch.setattr(main, "REGISTRY", LoadedRegistry())
+    monkeypatch.setattr(main, "predict_frame_task", lambda name, X: blocked_call(release))
+    client = TestClient(main.app)
+    try:
+        # every slot busy -> 429 with Retry-After
+        busy = executor.submit(blocked_call, release)
+        response = client.post("/predict/strict/batch", json=[VEHICLE])
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        release.set()
+        busy.result(timeout=5)
+        wait_until(lambda: executor.pending == 0)
+
+        # slow model call -> 504, and its slot is released once the call ends
+        release.clear()
+        response = client.post("/predict/strict/batch", json=[VEHICLE])
+        assert response.status_code == 504
+        release.set()
+        wait_until(lambda: executor.pending == 0)
+        assert executor.stats()["timeouts"] == 1
+    finally:
+        release.set()
+        executor.shutdown()
@@ -8,11 +8,17 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).resolve().parents[1]
 sys.path.append(str(ROOT_DIR))
 
-import joblib
 import pandas as pd
 import streamlit as st
 
-from src.risk.risk_scoring import risk_category_from_co2, risk_score_from_co2, generate_reasons
+from src.risk.risk_scoring import (
+    risk_category_from_co2, risk_score_from_co2, generate_reasons,
+    risk_category_from_co2_array, risk_score_from_co2_array, generate_reasons_batch,
+    reasons_from_attributions
+)
+from src.models.prediction_cache import PredictionCache, cached_predict, row_key
+from src.models.registry import ModelRegistry
+from src.config import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CATALOG_LOOKUP, MODEL_MMAP, STRICT_MODEL, FULL_MODEL
 
 # ---------- Page config ----------
 st.set_page_config(
@@ -99,14 +105,36 @@ st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 ARTIFACTS = ROOT_DIR / "artifacts" / "models"
 
 @st.cache_resource
-def load_models():
-    strict_path = ARTIFACTS / "rf_strict_v1.joblib"
-    full_path = ARTIFACTS / "rf_full_v1.joblib"
-    strict_model = joblib.load(strict_path)
-    full_model = joblib.load(full_path)
-    return strict_model, full_model
+def get_registry():
+    # models are loaded on the first prediction, not when the page first renders
+    # compiled: fast single-row path; .predict(df) runs the preprocessor + forest
+    # forests are memory-mapped from the .flat/ export when present
+    return ModelRegistry(ARTIFACTS, [STRICT_MODEL, FULL_MODEL], mmap=MODEL_MMAP)
+
+REGISTRY = get_registry()
+
+@st.cache_resource
+def load_prediction_caches():
+    # one cache per model, shared across sessions like the models themselves
+    return {
+        STRICT_MODEL: PredictionCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS),
+        FULL_MODEL: PredictionCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS),
+    }
 
-STRICT_MODEL, FULL_MODEL = load_models()
+PREDICTION_CACHES = load_prediction_caches()
+
+@st.cache_resource
+def load_catalog_lookup():
+    # precomputed catalog predictions, loaded on first use
+    if not CATALOG_LOOKUP:
+        return None
+    from src.models.catalog_table import load_catalog_table
+    return load_catalog_table(ARTIFACTS / "catalog_predictions_v1.npz")
+
+def catalog_for(mode: str, model):
+    # only used if built from the loaded model
+    table = load_catalog_lookup()
+    return table if table is not None and table.matches(mode, model) else None
 
 # ---------- Helpers ----------
 def badge_html(compliance: str) -> str:
@@ -127,32 +155,41 @@ def app_header():
         unsafe_allow_html=True
     )
 
-def build_strict_df(make, vehicle_class, transmission, fuel_type_code, engine_size, cylinders):
-    return pd.DataFrame([{
-        "Make": make,
-        "Vehicle Class": vehicle_class,
-        "Transmission": transmission,
-        "Fuel Type": fuel_type_code,
-        "Engine Size(L)": float(engine_size),
-        "Cylinders": int(cylinders),
-    }])
-
-def build_full_df(make, vehicle_class, transmission, fuel_type_code, engine_size, cylinders, fuel_comb):
-    return pd.DataFrame([{
+def build_strict_row(make, vehicle_class, transmission, fuel_type_code, engine_size, cylinders):
+    return {
         "Make": make,
         "Vehicle Class": vehicle_class,
         "Transmission": transmission,
         "Fuel Type": fuel_type_code,
         "Engine Size(L)": float(engine_size),
         "Cylinders": int(cylinders),
-        "Fuel Consumption Comb (L/100 km)": float(fuel_comb),
-    }])
+    }
 
-def predict_and_decide(df: pd.DataFrame, model, mode: str, limit: float, model_name: str):
-    co2_pred = float(model.predict(df)[0])
-    row_dict = df.iloc[0].to_dict()
+def build_full_row(make, vehicle_class, transmission, fuel_type_code, engine_size, cylinders, fuel_comb):
+    row = build_strict_row(make, vehicle_class, transmission, fuel_type_code, engine_size, cylinders)
+    row["Fuel Consumption Comb (L/100 km)"] = float(fuel_comb)
+    return row
+
+def explain_row(model, row_dict: dict, mode: str):
+    """(bias, {feature: g/km}) for a vehicle row: catalog table first, else one decision-path pass."""
+    table = catalog_for(mode, model)
+    key = row_key(row_dict, mode)
+    if table is not None and key is not None:
+        i = table.find(key, mode)
+        stored = table.attributions(i, mode) if i is not None else None
+        if stored is not None:
+            return stored
+    bias, contrib = model.attribute_rows([row_dict])
+    return bias, dict(zip(model.input_features, contrib[0].tolist()))
+
+def predict_and_decide(row_dict: dict, mode: str, limit: float, model_name: str, interval: bool = False,
+                       explain: bool = False):
+    model = REGISTRY.get(model_name)
+    co2_pred = cached_predict(
+        PREDICTION_CACHES[model_name], model, row_dict, mode, catalog=catalog_for(mode, model)
+    )
 
-    return {
+    res = {
         "model": model_name,
         "co2_pred_g_km": round(co2_pred, 2),
         "risk_score": risk_score_from_co2(co2_pred, limit),
@@ -160,6 +197,31 @@ def predict_and_decide(df: pd.DataFrame, model, mode: str, limit: float, model_n
         "reasons": generate_reasons(row_dict, mode=mode),
         "limit_g_km": float(limit),
     }
+    if explain and model.is_forest:
+        bias, contributions = explain_row(model, row_dict, mode)
+        res["reasons"] = reasons_from_attributions(row_dict, contributions)
+        res["attributions"] = contributions
+    if interval and model.is_forest:
+        # per-tree spread of the same forest (its mean is co2_pred)
+        _, std, q = model.predict_interval_rows([row_dict])
+        res["interval"] = {"std": round(float(std[0]), 2), "p10": round(float(q[0, 0]), 2), "p90": round(float(q[0, 1]), 2)}
+    return res
+
+def predict_batch_frame(model_name: str, X: pd.DataFrame, interval: bool = False):
+    """Predictions for a DataFrame, plus co2_std / co2_p10 / co2_p90 columns when asked (forests only)."""
+    model = REGISTRY.get(model_name)
+    if not (interval and model.is_forest):
+        return model.predict(X), {}
+    preds, std, q = model.predict_interval(X)
+    return preds, {"co2_std": std.round(2), "co2_p10": q[:, 0].round(2), "co2_p90": q[:, 1].round(2)}
+
+def attribute_batch_frame(model_name: str, X: pd.DataFrame):
+    """Per-feature attributions (g/km) for every row in one pass, or None if the model is not a forest."""
+    model = REGISTRY.get(model_name)
+    if not model.is_forest:
+        return None
+    _, contrib = model.attribute(X)
+    return pd.DataFrame(contrib.round(2), columns=model.input_features, index=X.index)
 
 # ---------- Header ----------
 app_header()
@@ -185,6 +247,17 @@ with st.sidebar:
 
     st.caption("Tip: Raise limit for easier PASS. Lower limit for stricter control.")
 
+    show_interval = st.checkbox(
+        "Show uncertainty (P10–P90)",
+        value=False,
+        help="Spread of the forest's tree predictions: wide means the trees disagree. Not a calibrated interval."
+    )
+    show_attributions = st.checkbox(
+        "Explain with model attributions",
+        value=False,
+        help="Reasons from the forest's decision paths: g/km each input moves the prediction vs. the average vehicle."
+    )
+
 # ---------- Tabs ----------
 tab1, tab2 = st.tabs(["🔎 Vehicle Predictor", "📦 Fleet Batch Upload"])
 
@@ -282,11 +355,13 @@ with tab1:
         if predict_btn:
             try:
                 if model_mode.startswith("STRICT"):
-                    df = build_strict_df(make, vehicle_class, transmission, fuel_type, engine_size, cylinders)
-                    res = predict_and_decide(df, STRICT_MODEL, mode="STRICT", limit=vehicle_limit, model_name="rf_strict_v1")
+                    row = build_strict_row(make, vehicle_class, transmission, fuel_type, engine_size, cylinders)
+                    res = predict_and_decide(row, mode="STRICT", limit=vehicle_limit, model_name=STRICT_MODEL, interval=show_interval,
+                                              explain=show_attributions)
                 else:
-                    df = build_full_df(make, vehicle_class, transmission, fuel_type, engine_size, cylinders, fuel_comb)
-                    res = predict_and_decide(df, FULL_MODEL, mode="FULL", limit=vehicle_limit, model_name="rf_full_v1")
+                    row = build_full_row(make, vehicle_class, transmission, fuel_type, engine_size, cylinders, fuel_comb)
+                    res = predict_and_decide(row, mode="FULL", limit=vehicle_limit, model_name=FULL_MODEL, interval=show_interval,
+                                              explain=show_attributions)
 
                 c1, c2, c3 = st.columns(3)
                 with c1:
@@ -320,10 +395,17 @@ with tab1:
                         unsafe_allow_html=True
                     )
 
+                if "interval" in res:
+                    iv = res["interval"]
+                    st.caption(f'Tree spread: P10 **{iv["p10"]}** – P90 **{iv["p90"]}** g/km (std {iv["std"]})')
+
                 st.write("")
                 st.markdown("### 🔎 Top Reasons")
                 for r in res["reasons"]:
                     st.markdown(f"- {r}")
+                if "attributions" in res:
+                    contributions = pd.Series(res["attributions"], name="g/km vs. average").round(2)
+                    st.bar_chart(contributions.sort_values())
 
                 st.caption(f'Model used: **{res["model"]}** | Your Limit: **{res["limit_g_km"]} g/km**')
 
@@ -362,6 +444,7 @@ with tab2:
         st.markdown("### Preview")
         st.dataframe(df_in, use_container_width=True)
 
+        with_reasons = st.checkbox("Include reasons", value=False)
         run_btn = st.button("Run Batch Predictions")
 
         if run_btn:
@@ -378,21 +461,39 @@ with tab2:
                     if missing:
                         st.error(f"Missing columns for FULL mode: {missing}")
                     else:
-                        preds = FULL_MODEL.predict(out_df[required])
+                        preds, spread = predict_batch_frame(FULL_MODEL, out_df[required], show_interval)
                         out_df["co2_pred_g_km"] = [round(float(x), 2) for x in preds]
+                        out_df = out_df.assign(**spread)
                 else:
                     required = ["Make", "Vehicle Class", "Transmission", "Fuel Type", "Engine Size(L)", "Cylinders"]
                     missing = [c for c in required if c not in out_df.columns]
                     if missing:
                         st.error(f"Missing columns for STRICT mode: {missing}")
                     else:
-                        preds = STRICT_MODEL.predict(out_df[required])
+                        preds, spread = predict_batch_frame(STRICT_MODEL, out_df[required], show_interval)
                         out_df["co2_pred_g_km"] = [round(float(x), 2) for x in preds]
+                        out_df = out_df.assign(**spread)
 
                 if "co2_pred_g_km" in out_df.columns:
-                    # Risk score + decision
-                    out_df["risk_score"] = out_df["co2_pred_g_km"].apply(lambda x: risk_score_from_co2(float(x), float(vehicle_limit)))
-                    out_df["decision"] = out_df["co2_pred_g_km"].apply(lambda x: risk_category_from_co2(float(x), float(vehicle_limit)))
+                    # Risk score + decision (vectorized, same values as the scalar functions)
+                    preds = out_df["co2_pred_g_km"].to_numpy(dtype=float)
+                    out_df["risk_score"] = risk_score_from_co2_array(preds, float(vehicle_limit))
+                    out_df["decision"] = risk_category_from_co2_array(preds, float(vehicle_limit))
+                    mode = "FULL" if model_mode.startswith("FULL") else "STRICT"
+                    attr = None
+                    if show_attributions:
+                        attr = attribute_batch_frame(FULL_MODEL if mode == "FULL" else STRICT_MODEL, out_df[required])
+                    if with_reasons:
+                        if attr is not None:
+                            reasons = [
+                                reasons_from_attributions(row, contributions)
+                                for row, contributions in zip(out_df[required].to_dict("records"), attr.to_dict("records"))
+                            ]
+                        else:
+                            reasons = generate_reasons_batch(out_df, mode=mode)
+                        out_df["reasons"] = [" | ".join(r) for r in reasons]
+                    if attr is not None:
+                        out_df = out_df.join(attr.add_prefix("attr: "))
 
                     st.markdown("### ✅ Results")
                     st.dataframe(out_df, use_container_width=True)
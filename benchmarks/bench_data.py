@@ -0,0 +1,21 @@
+from benchmarks.common import DATA_PATH, CACHE_DIR, time_calls, latency_stats
+
+
+def bench_data(df, quick=False) -> dict:
+    """Loading + clean_data of co2.csv: inferred-dtype read_csv vs typed CSV vs the parquet cache."""
+    import pandas as pd
+    from src.data.load_data import load_raw_data, read_csv_typed
+    from src.data.preprocess import clean_data
+
+    paths = {
+        "data.read_csv_default": lambda: clean_data(pd.read_csv(DATA_PATH)),
+        "data.read_csv_typed": lambda: clean_data(read_csv_typed(DATA_PATH)),
+        "data.load_cached": lambda: clean_data(load_raw_data(DATA_PATH, cache_dir=CACHE_DIR)),
+    }
+    results = {}
+    for name, load in paths.items():
+        loaded = load()
+        stats = latency_stats(time_calls(load, 10 if quick else 30), len(loaded))
+        stats["frame_mb"] = loaded.memory_usage(deep=True).sum() / 1e6
+        results[name] = stats
+    return results
@@ -0,0 +1,198 @@
+import joblib
+import numpy as np
+
+from benchmarks.common import ARTIFACTS, time_calls, latency_stats
+
+BATCH_SIZES = [1, 10, 1_000, 100_000]
+
+
+def _repeat(batch_size, quick):
+    if batch_size <= 10:
+        return 50 if quick else 200
+    if batch_size <= 1_000:
+        return 5 if quick else 20
+    return 1 if quick else 3
+
+
+def bench_pipeline(df, quick=False) -> dict:
+    """sklearn Pipeline.predict (preprocessor + forest) per batch size."""
+    from src.data.preprocess import FEATURE_SET_STRICT, FEATURE_SET_FULL
+
+    results = {}
+    for mode, feature_set in [("strict", FEATURE_SET_STRICT), ("full", FEATURE_SET_FULL)]:
+        pipe = joblib.load(ARTIFACTS / f"rf_{mode}_v1.joblib")
+        for batch_size in BATCH_SIZES:
+            X = df[feature_set].sample(batch_size, replace=True, random_state=42)
+            times = time_calls(lambda: pipe.predict(X), _repeat(batch_size, quick))
+            results[f"pipeline.{mode}.batch_{batch_size}"] = latency_stats(times, batch_size)
+    return results
+
+
+def bench_compiled(df, quick=False) -> dict:
+    """Serving path: CompiledPipeline.predict_row on one vehicle dict."""
+    from src.data.preprocess import FEATURE_SET_STRICT, FEATURE_SET_FULL
+    from src.models.compiled_pipeline import load_compiled_pipeline
+
+    results = {}
+    for mode, feature_set in [("strict", FEATURE_SET_STRICT), ("full", FEATURE_SET_FULL)]:
+        model = load_compiled_pipeline(ARTIFACTS / f"rf_{mode}_v1.joblib")
+        row = df[feature_set].iloc[0].to_dict()
+        times = time_calls(lambda: model.predict_row(row), 200 if quick else 1000)
+        results[f"compiled.{mode}.predict_row"] = latency_stats(times)
+    return results
+
+
+def bench_interval(df, quick=False) -> dict:
+    """
+    Per-tree spread (mean, std, P10/P90) vs plain prediction on the same
+    CompiledPipeline, one vehicle and 1,000 vehicles per call.
+    """
+    from src.data.preprocess import FEATURE_SET_STRICT, FEATURE_SET_FULL
+    from src.models.compiled_pipeline import load_compiled_pipeline
+
+    results = {}
+    for mode, feature_set in [("strict", FEATURE_SET_STRICT), ("full", FEATURE_SET_FULL)]:
+        model = load_compiled_pipeline(ARTIFACTS / f"rf_{mode}_v1.joblib")
+        for batch_size in [1, 1_000]:
+            rows = df[feature_set].sample(batch_size, replace=True, random_state=42).to_dict("records")
+            repeat = _repeat(batch_size, quick)
+            plain = latency_stats(time_calls(lambda: model.predict_rows(rows), repeat), batch_size)
+            spread = latency_stats(time_calls(lambda: model.predict_interval_rows(rows), repeat), batch_size)
+            spread["overhead"] = spread["p50_ms"] / plain["p50_ms"] - 1
+            results[f"interval.{mode}.predict_rows_{batch_size}"] = plain
+            results[f"interval.{mode}.with_interval_{batch_size}"] = spread
+    return results
+
+
+def bench_attributions(df, quick=False) -> dict:
+    """Decision-path attributions (CompiledPipeline.attribute_rows), 1 / 10 / 1,000 vehicles per call."""
+    from src.data.preprocess import FEATURE_SET_STRICT, FEATURE_SET_FULL
+    from src.models.compiled_pipeline import load_compiled_pipeline
+
+    results = {}
+    for mode, feature_set in [("strict", FEATURE_SET_STRICT), ("full", FEATURE_SET_FULL)]:
+        model = load_compiled_pipeline(ARTIFACTS / f"rf_{mode}_v1.joblib")
+        for batch_size in [1, 10, 1_000]:
+            rows = df[feature_set].sample(batch_size, replace=True, random_state=42).to_dict("records")
+            times = time_calls(lambda: model.attribute_rows(rows), _repeat(batch_size, quick))
+            results[f"attributions.{mode}.rows_{batch_size}"] = latency_stats(times, batch_size)
+    return results
+
+
+def _api_payload(row, full):
+    payload = {
+        "Make": row["Make"],
+        "Vehicle_Class": row["Vehicle Class"],
+        "Transmission": row["Transmission"],
+        "Fuel_Type": row["Fuel Type"],
+        "Engine_Size_L": float(row["Engine Size(L)"]),
+        "Cylinders": int(row["Cylinders"]),
+    }
+    if full:
+        payload["Fuel_Consumption_Comb_L_100km"] = float(row["Fuel Consumption Comb (L/100 km)"])
+    return payload
+
+
+def bench_api(df, quick=False) -> dict:
+    """FastAPI endpoints through an in-process TestClient (models loaded before timing)."""
+    from fastapi.testclient import TestClient
+    import api.main as api
+
+    api.REGISTRY.warm_up(background=False)
+    client = TestClient(api.app)
+    n = 100 if quick else 500
+    rows = df.sample(n, replace=True, random_state=0).to_dict("records")
+
+    results = {}
+    for name, full in [("strict", False), ("full", True)]:
+        payloads = [_api_payload(r, full) for r in rows]
+        cache = api.FULL_CACHE if full else api.STRICT_CACHE
+        cache.clear()
+
+        it = iter(payloads * 2)
+        times = time_calls(lambda: client.post(f"/predict/{name}", json=next(it)), n)
+        results[f"api.predict_{name}"] = latency_stats(times)
+
+    fleet = {"co2_predictions": df["CO2 Emissions(g/km)"].astype(float).tolist()[:1000], "policy": "EU_2020_2024"}
+    times = time_calls(lambda: client.post("/fleet/compliance", json=fleet), 50 if quick else 200)
+    results["api.fleet_compliance_1k"] = latency_stats(times, len(fleet["co2_predictions"]))
+    return results
+
+
+CONCURRENCY = [1, 10, 50, 200]
+
+
+def bench_api_concurrent(df, quick=False) -> dict:
+    """
+    /predict/strict under 1..200 concurrent in-process clients: throughput and
+    latency per concurrency level (default setup: thread executor, micro-batching
+    on), plus micro-batching off and the process executor at the highest level.
+    Engine sizes are jittered so requests miss the catalog and cache and actually
+    reach the model. Each run gets its own executor with room for every client,
+    so 429s are not expected; any are counted in "rejected".
+    """
+    import asyncio
+    import time
+    import httpx
+    import api.main as api
+    from api.inference_executor import InferenceExecutor
+    from src.config import INFERENCE_WORKERS
+
+    api.REGISTRY.warm_up(background=False)
+    total = 300 if quick else 1000
+    rng = np.random.default_rng(0)
+    rows = df.sample(total, replace=True, random_state=1).to_dict("records")
+    payloads = [
+        dict(_api_payload(r, full=False), Engine_Size_L=round(float(r["Engine Size(L)"]) + rng.uniform(0.01, 0.05), 4))
+        for r in rows
+    ]
+
+    async def client(http, mine, latencies, rejected):
+        for payload in mine:
+            start = time.perf_counter()
+            response = await http.post("/predict/strict", json=payload)
+            if response.status_code == 429:
+                rejected.append(1)
+                continue
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async def load(clients):
+        latencies, rejected = [], []
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            start = time.perf_counter()
+            await asyncio.gather(*[
+                client(http, payloads[i::clients], latencies, rejected) for i in range(clients)
+            ])
+            wall = time.perf_counter() - start
+        return np.array(latencies), len(rejected), wall
+
+    top = CONCURRENCY[-1]
+    runs = [(f"api.load_{c}c.microbatch_on", c, True, "thread") for c in CONCURRENCY]
+    runs += [
+        (f"api.load_{top}c.microbatch_off", top, False, "thread"),
+        (f"api.load_{top}c.process", top, True, "process"),
+    ]
+
+    results = {}
+    saved = api.MICRO_BATCH, api.EXECUTOR
+    try:
+        for key, clients, micro_batch, kind in runs:
+            api.MICRO_BATCH = micro_batch
+            api.EXECUTOR = InferenceExecutor(api.REGISTRY, kind=kind, workers=INFERENCE_WORKERS, queue_size=clients)
+            api.STRICT_CACHE.clear()
+            if kind == "process":
+                asyncio.run(load(clients))   # first pass starts the workers and loads the models
+                api.STRICT_CACHE.clear()
+            try:
+                latencies, rejected, wall = asyncio.run(load(clients))
+            finally:
+                api.EXECUTOR.shutdown()
+            stats = latency_stats(latencies)
+            stats["rows_s"] = len(latencies) / wall   # requests/s across all clients
+            stats["rejected"] = rejected
+            results[key] = stats
+    finally:
+        api.MICRO_BATCH, api.EXECUTOR = saved
+    return results
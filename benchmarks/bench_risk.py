@@ -0,0 +1,36 @@
+from benchmarks.common import time_calls, latency_stats
+
+
+def bench_risk(df, quick=False) -> dict:
+    """Risk scoring + reasons: per-row Python calls vs the vectorized array versions."""
+    from src.data.preprocess import FEATURE_SET_FULL, TARGET
+    from src.risk.risk_scoring import (
+        risk_category_from_co2, risk_score_from_co2, generate_reasons,
+        risk_category_from_co2_array, risk_score_from_co2_array, generate_reasons_batch
+    )
+
+    rows = df[FEATURE_SET_FULL]
+    co2 = df[TARGET].to_numpy(dtype=float)
+    records = rows.to_dict("records")
+    repeat = 5 if quick else 20
+    n = len(df)
+
+    def per_row_scores():
+        for v in co2:
+            risk_score_from_co2(v, 200.0)
+            risk_category_from_co2(v, 200.0)
+
+    def vectorized_scores():
+        risk_score_from_co2_array(co2, 200.0)
+        risk_category_from_co2_array(co2, 200.0)
+
+    def per_row_reasons():
+        for r in records:
+            generate_reasons(r, mode="FULL")
+
+    return {
+        "risk.scores_per_row": latency_stats(time_calls(per_row_scores, repeat), n),
+        "risk.scores_vectorized": latency_stats(time_calls(vectorized_scores, repeat), n),
+        "risk.reasons_per_row": latency_stats(time_calls(per_row_reasons, repeat), n),
+        "risk.reasons_vectorized": latency_stats(time_calls(lambda: generate_reasons_batch(rows, mode="FULL"), repeat), n),
+    }
@@ -0,0 +1,26 @@
+import time
+
+from benchmarks.common import DATA_PATH, FEATURE_DIR
+
+
+def bench_training(df, quick=False) -> dict:
+    """Wall time of 5-fold CV (shared CV engine) and of the halving RF search."""
+    from sklearn.ensemble import RandomForestRegressor
+    from src.features.feature_store import load_design
+    from src.models.cv_engine import cross_validate_models, halving_search, default_cv
+    from src.models.tune_random_forest import PARAM_GRID
+
+    results = {}
+
+    start = time.perf_counter()
+    folds = load_design("STRICT", store_dir=FEATURE_DIR, data_path=DATA_PATH).folds(default_cv())
+    cross_validate_models({"RandomForest": RandomForestRegressor(n_estimators=100, random_state=42)}, folds)
+    results["training.cv_strict_rf100_5fold"] = {"wall_s": time.perf_counter() - start}
+
+    if not quick:
+        start = time.perf_counter()
+        space = {k: v for k, v in PARAM_GRID.items() if k != "n_estimators"}
+        halving_search(RandomForestRegressor(random_state=42), space, folds, max_estimators=300)
+        results["training.tune_strict_halving"] = {"wall_s": time.perf_counter() - start}
+
+    return results
@@ -0,0 +1,69 @@
+import resource
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT_DIR / "data" / "raw" / "co2.csv"
+CACHE_DIR = ROOT_DIR / "data" / "processed"
+FEATURE_DIR = ROOT_DIR / "data" / "features"
+ARTIFACTS = ROOT_DIR / "artifacts" / "models"
+
+
+def load_data():
+    from src.data.load_data import load_raw_data
+    from src.data.preprocess import clean_data
+    return clean_data(load_raw_data(DATA_PATH, cache_dir=CACHE_DIR))
+
+
+def ensure_models():
+    """Train + save rf_strict_v1 / rf_full_v1 (as save_final_models does) if they are missing."""
+    from src.data.preprocess import FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
+    from src.features.feature_store import load_design
+    from src.models.save_final_models import train_and_eval_baseline_rf, save_artifacts
+
+    for mode, feature_set in [("STRICT", FEATURE_SET_STRICT), ("FULL", FEATURE_SET_FULL)]:
+        model_path = ARTIFACTS / f"rf_{mode.lower()}_v1.joblib"
+        if model_path.exists():
+            continue
+        print(f"Building missing {model_path.name} ...", flush=True)
+        design = load_design(mode, store_dir=FEATURE_DIR, data_path=DATA_PATH)
+        model, metrics = train_and_eval_baseline_rf(design, title=mode)
+        meta = {
+            "model_name": "RandomForestRegressor",
+            "feature_set": mode,
+            "features": feature_set,
+            "target": TARGET,
+            "metrics_holdout": metrics,
+            "notes": "Built by benchmarks (artifact was missing).",
+            "version": "v1"
+        }
+        save_artifacts(model, meta, model_path, model_path.with_suffix(".meta.json"))
+
+
+def time_calls(fn, repeat, warmup=1):
+    """Per-call wall times in seconds."""
+    for _ in range(warmup):
+        fn()
+    times = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+    return times
+
+
+def latency_stats(times, rows_per_call=1) -> dict:
+    p50 = np.percentile(times, 50)
+    return {
+        "p50_ms": float(p50 * 1000),
+        "p99_ms": float(np.percentile(times, 99) * 1000),
+        # from the median call, so one slow outlier does not move the gated number
+        "rows_s": float(rows_per_call / p50),
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,141 @@
+"""
+Benchmark suite for the inference hot paths.
+
+    python -m benchmarks.run                 # full run, compare with benchmarks/baseline.json
+    python -m benchmarks.run --quick         # fewer repeats, no tuning benchmark
+    python -m benchmarks.run --update-baseline
+
+Results are written to benchmarks/results/latest.json. A metric regresses when it
+is worse than the baseline by more than --threshold (relative); the exit code
+is 1 if anything regressed. Gated metrics: p50 latency, rows/s, wall time and
+peak RSS (p99 is reported but too noisy to gate on).
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.common import ROOT_DIR, ensure_models, load_data, peak_rss_mb
+
+BENCH_DIR = ROOT_DIR / "benchmarks"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+RESULTS_PATH = BENCH_DIR / "results" / "latest.json"
+
+# metric -> True if higher is better
+GATED = {"p50_ms": False, "rows_s": True, "wall_s": False, "peak_rss_mb": False}
+
+
+def run_all(quick=False, skip_training=False) -> dict:
+    from benchmarks.bench_inference import (
+        bench_pipeline, bench_compiled, bench_interval, bench_attributions, bench_api, bench_api_concurrent
+    )
+    from benchmarks.bench_risk import bench_risk
+    from benchmarks.bench_data import bench_data
+    from benchmarks.bench_training import bench_training
+
+    ensure_models()
+    df = load_data()
+
+    sections = [
+        ("data", bench_data),
+        ("pipeline", bench_pipeline),
+        ("compiled", bench_compiled),
+        ("interval", bench_interval),
+        ("attributions", bench_attributions),
+        ("api", bench_api),
+        ("api_load", bench_api_concurrent),
+        ("risk", bench_risk),
+    ]
+    if not skip_training:
+        sections.append(("training", bench_training))
+
+    benchmarks = {}
+    for name, bench in sections:
+        start = time.perf_counter()
+        benchmarks.update(bench(df, quick=quick))
+        print(f"{name:<10} done in {time.perf_counter() - start:6.1f}s", flush=True)
+
+    benchmarks["process"] = {"peak_rss_mb": peak_rss_mb()}
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "quick": quick,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": benchmarks,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """List of (benchmark, metric, baseline, current, change) that got worse than `threshold`."""
+    regressions = []
+    for bench, metrics in results["benchmarks"].items():
+        base_metrics = baseline.get("benchmarks", {}).get(bench, {})
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            if metric not in GATED or not base:
+                continue
+            change = (value - base) / base
+            worse = -change if GATED[metric] else change
+            if worse > threshold:
+                regressions.append((bench, metric, base, value, change))
+    return regressions
+
+
+def print_results(results: dict):
+    print(f"\n{'benchmark':<34} {'p50 ms':>9} {'p99 ms':>9} {'rows/s':>12} {'wall s':>8}")
+    for bench, m in results["benchmarks"].items():
+        if "peak_rss_mb" in m:
+            continue
+        print(
+            f"{bench:<34} "
+            f"{m.get('p50_ms', float('nan')):>9.3f} {m.get('p99_ms', float('nan')):>9.3f} "
+            f"{m.get('rows_s', float('nan')):>12,.0f} {m.get('wall_s', float('nan')):>8.1f}"
+        )
+    print(f"peak RSS: {results['benchmarks']['process']['peak_rss_mb']:.0f} MB")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inference / training benchmarks with baseline comparison.")
+    parser.add_argument("--quick", action="store_true", help="Fewer repeats, skip the tuning benchmark")
+    parser.add_argument("--skip-training", action="store_true", help="Skip CV/tuning benchmarks")
+    parser.add_argument("--output", default=str(RESULTS_PATH))
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run_all(quick=args.quick, skip_training=args.skip_training)
+    print_results(results)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\nResults: {output}")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Baseline updated: {baseline_path}")
+        sys.exit(0)
+
+    if not baseline_path.exists():
+        print("No baseline yet (run with --update-baseline).")
+        sys.exit(0)
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("quick") != results["quick"]:
+        print("Note: baseline and this run use different --quick settings; repeat counts differ.")
+    regressions = compare(results, baseline, args.threshold)
+    if not regressions:
+        print(f"No regressions vs {baseline_path.name} (threshold {100 * args.threshold:.0f}%).")
+        sys.exit(0)
+
+    print(f"\nREGRESSIONS vs {baseline_path.name} (threshold {100 * args.threshold:.0f}%):")
+    for bench, metric, base, value, change in regressions:
+        print(f" - {bench} {metric}: {base:.4g} -> {value:.4g} ({100 * change:+.1f}%)")
+    sys.exit(1)
@@ -0,0 +1,51 @@
+import os
+
+# ---- Prediction cache (API + dashboard)
+# Max distinct vehicle specs kept per model; least recently used are evicted first
+CACHE_MAX_ENTRIES = int(os.environ.get("CO2_CACHE_MAX_ENTRIES", 10_000))
+# Entries older than this are recomputed (0 = never expire)
+CACHE_TTL_SECONDS = float(os.environ.get("CO2_CACHE_TTL_SECONDS", 3600))
+
+# ---- Catalog lookup mode
+# Answer known catalog specs from the precomputed table (src/models/catalog_table.py)
+CATALOG_LOOKUP = os.environ.get("CO2_CATALOG_LOOKUP", "1") == "1"
+
+# ---- Fleet compliance sessions (API)
+# Open chunked-upload sessions kept in memory at once
+MAX_FLEET_SESSIONS = int(os.environ.get("CO2_MAX_FLEET_SESSIONS", 1000))
+# Sessions idle for longer than this are dropped (evicted when a new session is created)
+FLEET_SESSION_TTL_SECONDS = float(os.environ.get("CO2_FLEET_SESSION_TTL_SECONDS", 3600))
+
+# ---- Served models
+# Artifact names under artifacts/models (save_final_models.py rf | hgb writes rf_* / hgb_*)
+STRICT_MODEL = os.environ.get("CO2_STRICT_MODEL", "rf_strict_v1")
+FULL_MODEL = os.environ.get("CO2_FULL_MODEL", "rf_full_v1")
+
+# ---- Model loading
+# Serve forests from memory-mapped .flat/ exports when present (shared across workers)
+MODEL_MMAP = os.environ.get("CO2_MODEL_MMAP", "1") == "1"
+# Load models in a background thread at API startup (0 = only on first request)
+MODEL_WARMUP = os.environ.get("CO2_MODEL_WARMUP", "1") == "1"
+
+# ---- Micro-batching (API single-vehicle endpoints)
+# Coalesce concurrent cache-missing requests into one model call
+MICRO_BATCH = os.environ.get("CO2_MICRO_BATCH", "1") == "1"
+# Rows per coalesced call / how long the first request waits for others
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("CO2_MICRO_BATCH_MAX_SIZE", 64))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get("CO2_MICRO_BATCH_MAX_WAIT_MS", 2.0))
+# Rows allowed to wait for a batch before requests get 429
+MICRO_BATCH_MAX_QUEUE = int(os.environ.get("CO2_MICRO_BATCH_MAX_QUEUE", 1024))
+
+# ---- Inference executor (API)
+# "thread" (forests pinned to n_jobs=1) or "process" (models loaded once per worker)
+INFERENCE_EXECUTOR = os.environ.get("CO2_INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.environ.get("CO2_INFERENCE_WORKERS", os.cpu_count() or 1))
+# Model calls allowed to wait for a worker before requests get 429
+INFERENCE_QUEUE_SIZE = int(os.environ.get("CO2_INFERENCE_QUEUE_SIZE", 32))
+# Requests waiting longer than this for a prediction get 504
+INFERENCE_TIMEOUT_S = float(os.environ.get("CO2_INFERENCE_TIMEOUT_S", 10.0))
+
+# ---- API profiling
+# Run every N-th instrumented request under cProfile (0 = off) and dump .prof files here
+PROFILE_EVERY_N = int(os.environ.get("CO2_PROFILE_EVERY_N", 0))
+PROFILE_DIR = os.environ.get("CO2_PROFILE_DIR", "artifacts/profiles")
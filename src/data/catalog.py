@@ -1,5 +1,7 @@
 import pandas as pd
 
+from src.data.load_data import RAW_DATA_PATH, load_raw_data
+
 CATALOG_COLS = [
     "Make",
     "Model",
@@ -11,8 +13,8 @@ CATALOG_COLS = [
     "Fuel Consumption Comb (L/100 km)",
 ]
 
-def load_catalog(path="D:/ML_PROJECTS/co2-risk-platform/data/raw/co2.csv") -> pd.DataFrame:
-    df = pd.read_csv(path)
+def load_catalog(path=RAW_DATA_PATH) -> pd.DataFrame:
+    df = load_raw_data(path)
     # keep only needed cols
     df = df[CATALOG_COLS].dropna()
     # remove duplicates (same spec repeated)
@@ -1,13 +1,110 @@
-import pandas as pd
+import hashlib
+import json
+import time
 from pathlib import Path
 
-def load_raw_data() -> pd.DataFrame:
-    data_path = Path("D:/ML_PROJECTS/co2-risk-platform/data/raw/co2.csv")
-    df = pd.read_csv(data_path)
+import pandas as pd
+
+RAW_DATA_PATH = Path("data/raw/co2.csv")
+CACHE_DIR = Path("data/processed")
+
+# explicit dtypes instead of inference: object columns -> category, int64 -> smallest
+# int that holds the dataset's range. Model feature columns stay float64: split
+# thresholds sit within float32 rounding of the dataset's values, so training on
+# float32 copies would route vehicles differently from the float64 rows the API and
+# dashboard serve. Only the non-feature fuel consumption columns are float32.
+DTYPES = {
+    "Make": "category",
+    "Model": "category",
+    "Vehicle Class": "category",
+    "Engine Size(L)": "float64",
+    "Cylinders": "int8",
+    "Transmission": "category",
+    "Fuel Type": "category",
+    "Fuel Consumption City (L/100 km)": "float32",
+    "Fuel Consumption Hwy (L/100 km)": "float32",
+    "Fuel Consumption Comb (L/100 km)": "float64",
+    "Fuel Consumption Comb (mpg)": "int16",
+    "CO2 Emissions(g/km)": "int16",
+}
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def read_csv_typed(path, usecols=None) -> pd.DataFrame:
+    """read_csv with DTYPES (pyarrow engine when installed)."""
+    engine = "pyarrow" if _has_pyarrow() else "c"
+    return pd.read_csv(path, dtype=DTYPES, usecols=usecols, engine=engine)
+
+
+def file_hash(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_paths(path, cache_dir=CACHE_DIR):
+    stem = Path(path).stem
+    return Path(cache_dir) / f"{stem}.parquet", Path(cache_dir) / f"{stem}.meta.json"
+
+
+def load_raw_data(path=RAW_DATA_PATH, cache=True, cache_dir=CACHE_DIR) -> pd.DataFrame:
+    """
+    The raw dataset with DTYPES. The first call converts the CSV to parquet
+    under cache_dir; later calls read the parquet file until the CSV's
+    sha256 changes. Without pyarrow (or with cache=False) the CSV is parsed.
+    """
+    if not cache or not _has_pyarrow():
+        return read_csv_typed(path)
+
+    parquet_path, meta_path = cache_paths(path, cache_dir)
+    source_hash = file_hash(path)
+    if parquet_path.exists() and meta_path.exists():
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        # rebuilt when the CSV or DTYPES change
+        if meta.get("source_sha256") == source_hash and meta.get("dtypes") == DTYPES:
+            return pd.read_parquet(parquet_path)
+
+    df = read_csv_typed(path)
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(parquet_path, index=False)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"source": str(path), "source_sha256": source_hash, "dtypes": DTYPES, "rows": len(df)}, f, indent=2)
     return df
 
+
+def _median_ms(fn, repeat=20):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000, df
+
+
 if __name__ == "__main__":
-    df = load_raw_data()
+    from src.data.preprocess import clean_data
+
+    load_raw_data()  # build the cache once
+
+    paths = [
+        ("read_csv (inferred dtypes)", lambda: clean_data(pd.read_csv(RAW_DATA_PATH))),
+        ("read_csv_typed", lambda: clean_data(read_csv_typed(RAW_DATA_PATH))),
+        ("load_raw_data (parquet cache)", lambda: clean_data(load_raw_data())),
+    ]
+    print(f"{'path':<32} {'load ms':>8} {'memory MB':>10}")
+    for name, fn in paths:
+        ms, df = _median_ms(fn)
+        print(f"{name:<32} {ms:>8.1f} {df.memory_usage(deep=True).sum() / 1e6:>10.2f}")
+
     print("shape: ", df.shape)
-    print("columns: ", df.columns)
-    print(df.head())
\ No newline at end of file
+    print(df.dtypes)
@@ -16,8 +16,7 @@ CATEGORICAL_COLS = [
 ]
 
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df = df.drop_duplicates()
+    df = df.drop_duplicates()   # new frame, no extra copy needed
     df = df.dropna(subset=[TARGET])
     
     return df
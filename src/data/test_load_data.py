@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+
+from src.data.load_data import load_raw_data, read_csv_typed
+from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
+from src.features.build_features import build_preprocessor, get_feature_types
+from src.models.compiled_pipeline import compile_pipeline
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "raw" / "co2.csv"
+
+
+def test_typed_training_matches_float64_serving(tmp_path):
+    typed = clean_data(load_raw_data(DATA_PATH, cache_dir=tmp_path))
+    assert typed.equals(clean_data(read_csv_typed(DATA_PATH)))
+    raw = clean_data(pd.read_csv(DATA_PATH))    # float64, as the API / dashboard send it
+
+    for feature_set in [FEATURE_SET_STRICT, FEATURE_SET_FULL]:
+        num_cols, cat_cols = get_feature_types(typed, feature_set)
+        pipe = Pipeline(steps=[
+            ("preprocessor", build_preprocessor(num_cols, cat_cols)),
+            ("model", RandomForestRegressor(n_estimators=30, random_state=42, n_jobs=1))
+        ]).fit(typed[feature_set], typed[TARGET])
+
+        expected = pipe.predict(typed[feature_set])
+        assert np.array_equal(pipe.predict(raw[feature_set]), expected)
+        assert np.array_equal(compile_pipeline(pipe).predict_rows(raw[feature_set].to_dict("records")), expected)
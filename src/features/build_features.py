@@ -1,26 +1,61 @@
+import pandas as pd
 from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder
 from sklearn.pipeline import Pipeline
 
-def build_preprocessor(numeric_features, categorical_features):
+def get_feature_types(df, feature_set):
+    # object (plain read_csv) and category (load_raw_data) columns are both categorical
+    numeric = [c for c in feature_set if pd.api.types.is_numeric_dtype(df[c])]
+    categorical = [c for c in feature_set if not pd.api.types.is_numeric_dtype(df[c])]
+    return numeric, categorical
+
+
+def build_preprocessor(numeric_features, categorical_features, encoding="onehot", sparse=False,
+                       min_frequency=None, max_categories=None):
+    """
+    encoding="onehot":  one column per category (default). sparse=True keeps
+                        the output a CSR matrix through the ColumnTransformer.
+    encoding="ordinal": one integer-code column per categorical feature; only
+                        meaningful for tree models. Unseen categories -> -1.
+    min_frequency / max_categories group rare categories into one shared
+    "infrequent" column (one-hot) or code (ordinal); unseen categories then
+    fall into that group too.
+    """
     numeric_transformer = Pipeline(
         steps=[
         ('scaler', StandardScaler())
     ]
         )
 
-    categorical_transformer = Pipeline(
-        steps=[
-        ('onehot', OneHotEncoder(
-            handle_unknown='ignore',
-            sparse_output=False))
-    ])
+    capped = min_frequency is not None or max_categories is not None
+    if encoding == "onehot":
+        categorical_transformer = Pipeline(
+            steps=[
+            ('onehot', OneHotEncoder(
+                handle_unknown='infrequent_if_exist' if capped else 'ignore',
+                sparse_output=sparse,
+                min_frequency=min_frequency,
+                max_categories=max_categories))
+        ])
+    elif encoding == "ordinal":
+        categorical_transformer = Pipeline(
+            steps=[
+            ('ordinal', OrdinalEncoder(
+                handle_unknown='use_encoded_value',
+                unknown_value=-1,
+                min_frequency=min_frequency,
+                max_categories=max_categories))
+        ])
+    else:
+        raise ValueError(f"Unknown encoding: {encoding}")
 
     preprocessor = ColumnTransformer(
         transformers=[
             ('num', numeric_transformer, numeric_features),
             ('cat', categorical_transformer, categorical_features)
-        ]
+        ],
+        # any share of non-zeros: a sparse one-hot block stays sparse after hstack
+        sparse_threshold=1.0 if sparse else 0.3
     )
 
-    return preprocessor
\ No newline at end of file
+    return preprocessor
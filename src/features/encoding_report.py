@@ -0,0 +1,77 @@
+import time
+
+from scipy import sparse as sp
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error
+
+from src.data.load_data import load_raw_data
+from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
+from src.data.split import split_data
+from src.features.build_features import build_preprocessor, get_feature_types
+
+# build_preprocessor options compared against the default dense one-hot
+VARIANTS = {
+    "onehot dense": {},
+    "onehot sparse": {"sparse": True},
+    "onehot sparse, min_freq 10": {"sparse": True, "min_frequency": 10},
+    "ordinal": {"encoding": "ordinal"},
+}
+MODELS = {
+    "LinearRegression": LinearRegression(),
+    "RandomForest100": RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=1),
+}
+
+
+def matrix_mb(X) -> float:
+    if sp.issparse(X):
+        return (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1e6
+    return X.nbytes / 1e6
+
+
+def encoding_report(df, feature_set):
+    """Per (encoding, model): train matrix size, fit / predict time and holdout MAE."""
+    X_train, X_test, y_train, y_test = split_data(df[feature_set], df[TARGET])
+    num_cols, cat_cols = get_feature_types(df, feature_set)
+
+    rows = []
+    for variant, options in VARIANTS.items():
+        preprocessor = build_preprocessor(num_cols, cat_cols, **options)
+        Xt_train = preprocessor.fit_transform(X_train)
+        Xt_test = preprocessor.transform(X_test)
+
+        for model_name, model in MODELS.items():
+            if options.get("encoding") == "ordinal" and model_name == "LinearRegression":
+                continue  # integer codes are not a meaningful linear feature
+            model = clone(model)
+            start = time.perf_counter()
+            model.fit(Xt_train, y_train)
+            fit_s = time.perf_counter() - start
+            start = time.perf_counter()
+            preds = model.predict(Xt_test)
+            predict_ms = (time.perf_counter() - start) * 1000
+
+            rows.append({
+                "encoding": variant,
+                "model": model_name,
+                "columns": Xt_train.shape[1],
+                "matrix_mb": matrix_mb(Xt_train),
+                "fit_s": fit_s,
+                "predict_ms": predict_ms,
+                "MAE": mean_absolute_error(y_test, preds),
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    df = clean_data(load_raw_data())
+
+    for title, feature_set in [("STRICT", FEATURE_SET_STRICT), ("FULL", FEATURE_SET_FULL)]:
+        print(f"\n===== {title} | train {int(len(df) * 0.8)} rows =====")
+        print(f"{'encoding':<28} {'model':<17} {'cols':>5} {'MB':>6} {'fit s':>7} {'pred ms':>8} {'MAE':>8}")
+        for r in encoding_report(df, feature_set):
+            print(
+                f"{r['encoding']:<28} {r['model']:<17} {r['columns']:>5} {r['matrix_mb']:>6.2f} "
+                f"{r['fit_s']:>7.2f} {r['predict_ms']:>8.1f} {r['MAE']:>8.3f}"
+            )
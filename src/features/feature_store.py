@@ -0,0 +1,227 @@
+import copy
+import json
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.data.load_data import RAW_DATA_PATH, file_hash, load_raw_data
+from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
+from src.features.build_features import build_preprocessor, get_feature_types
+
+FEATURE_STORE_DIR = Path("data/features")
+FEATURE_SETS = {"STRICT": FEATURE_SET_STRICT, "FULL": FEATURE_SET_FULL}
+# categorical blocks kept in the store (build_preprocessor encoding names)
+ENCODINGS = ("onehot", "ordinal")
+# numerics are stored exactly as served: float32 copies would cross split thresholds
+NUMERIC_DTYPE = "float64"
+
+
+def build_design(df, mode, store_dir=FEATURE_STORE_DIR, source_hash=""):
+    """
+    Encode one feature set of the cleaned dataset once and save it under
+    store_dir/<mode>/:
+      numeric.npy          raw (unscaled) numeric columns, float64
+      onehot.npy           one-hot block, float32
+      ordinal.npy          one integer code per categorical feature, float32
+      y.npy                target, float64
+      preprocessor.joblib  build_preprocessor fitted on all rows (encoder state)
+      ordinal_preprocessor.joblib
+                           the same with encoding="ordinal"
+      meta.json            feature lists, encoded column names, source hash
+
+    Numerics stay unscaled so every fold / split fits its own StandardScaler on
+    its training rows only. The one-hot encoder has no statistics besides the
+    category list; a category that only occurs in a test fold gets a column
+    that is all zeros in training, which is what handle_unknown="ignore" gives.
+    """
+    mode = mode.upper()
+    feature_set = FEATURE_SETS[mode]
+    num_cols, cat_cols = get_feature_types(df, feature_set)
+    preprocessor = build_preprocessor(num_cols, cat_cols).fit(df[feature_set])
+    onehot = preprocessor.named_transformers_["cat"].transform(df[cat_cols])
+    # HistGradientBoosting takes at most 255 codes per categorical feature; rarer
+    # categories beyond that would share one code
+    ordinal_preprocessor = build_preprocessor(num_cols, cat_cols, encoding="ordinal", max_categories=255)
+    ordinal_preprocessor.fit(df[feature_set])
+    ordinal = ordinal_preprocessor.named_transformers_["cat"].transform(df[cat_cols])
+
+    directory = Path(store_dir) / mode.lower()
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / "numeric.npy", df[num_cols].to_numpy(dtype=NUMERIC_DTYPE))
+    np.save(directory / "onehot.npy", np.asarray(onehot, dtype=np.float32))
+    np.save(directory / "ordinal.npy", np.asarray(ordinal, dtype=np.float32))
+    np.save(directory / "y.npy", df[TARGET].to_numpy(dtype=np.float64))
+    joblib.dump(preprocessor, directory / "preprocessor.joblib")
+    joblib.dump(ordinal_preprocessor, directory / "ordinal_preprocessor.joblib")
+
+    meta = {
+        "mode": mode,
+        "feature_set": feature_set,
+        "numeric_features": num_cols,
+        "categorical_features": cat_cols,
+        "columns": list(preprocessor.get_feature_names_out()),
+        "encodings": list(ENCODINGS),
+        "numeric_dtype": NUMERIC_DTYPE,
+        "rows": len(df),
+        "source_sha256": source_hash,
+    }
+    with open(directory / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return directory
+
+
+class DesignMatrix:
+    """One saved feature set (see build_design), arrays memory-mapped by default."""
+
+    def __init__(self, directory, mmap=True):
+        directory = Path(directory)
+        mmap_mode = "r" if mmap else None
+        self.numeric = np.load(directory / "numeric.npy", mmap_mode=mmap_mode)
+        self.onehot = np.load(directory / "onehot.npy", mmap_mode=mmap_mode)
+        self.ordinal = np.load(directory / "ordinal.npy", mmap_mode=mmap_mode)
+        self.y = np.load(directory / "y.npy", mmap_mode=mmap_mode)
+        self.preprocessor = joblib.load(directory / "preprocessor.joblib")
+        self.ordinal_preprocessor = joblib.load(directory / "ordinal_preprocessor.joblib")
+        with open(directory / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        self.mode = self.meta["mode"]
+        self.feature_set = self.meta["feature_set"]
+        self.numeric_features = self.meta["numeric_features"]
+        self.categorical_features = self.meta["categorical_features"]
+        self.columns = self.meta["columns"]
+
+    def __len__(self):
+        return len(self.y)
+
+    def _numeric_frame(self, idx):
+        # with column names, so the scaler can go back into the ColumnTransformer
+        return pd.DataFrame(self.numeric[idx], columns=self.numeric_features)
+
+    def scaler(self, idx):
+        return StandardScaler().fit(self._numeric_frame(idx))
+
+    def _categorical(self, encoding):
+        if encoding == "onehot":
+            return self.onehot, self.preprocessor
+        if encoding == "ordinal":
+            return self.ordinal, self.ordinal_preprocessor
+        raise ValueError(f"Unknown encoding: {encoding}")
+
+    def encode(self, idx, scaler, sparse=False, encoding="onehot"):
+        """
+        Rows `idx` as the preprocessor would encode them with this fitted scaler;
+        sparse=True gives a CSR matrix (what build_preprocessor(sparse=True) outputs),
+        encoding="ordinal" the integer-code block instead of the one-hot one.
+        """
+        numeric = scaler.transform(self._numeric_frame(idx))
+        categorical = self._categorical(encoding)[0][idx]
+        if sparse:
+            return sp.hstack([sp.csr_matrix(numeric), sp.csr_matrix(categorical, dtype=np.float64)], format="csr")
+        return np.hstack([numeric, categorical])
+
+    def categorical_columns(self, encoding="ordinal"):
+        """Positions of the categorical block in encoded rows (numerics come first)."""
+        start = len(self.numeric_features)
+        return list(range(start, start + self._categorical(encoding)[0].shape[1]))
+
+    def rows(self, idx):
+        """Rows `idx` back as vehicle dicts (the API / CompiledPipeline input)."""
+        numeric = self.numeric[idx]
+        encoder = self.preprocessor.named_transformers_["cat"]
+        categories = encoder.inverse_transform(self.onehot[idx])
+        return [
+            {**dict(zip(self.numeric_features, n.tolist())), **dict(zip(self.categorical_features, c))}
+            for n, c in zip(numeric, categories)
+        ]
+
+    def split(self, test_size=0.2):
+        """(train_idx, test_idx): the same rows split_data picks."""
+        return train_test_split(np.arange(len(self)), test_size=test_size, random_state=42)
+
+    def folds(self, cv, sparse=False, encoding="onehot"):
+        """Same (X_train, y_train, X_test, y_test) list as cv_engine.precompute_folds."""
+        folds = []
+        for train_idx, test_idx in cv.split(self.numeric):
+            scaler = self.scaler(train_idx)
+            folds.append((
+                self.encode(train_idx, scaler, sparse, encoding), self.y[train_idx],
+                self.encode(test_idx, scaler, sparse, encoding), self.y[test_idx]
+            ))
+        return folds
+
+    def fit(self, model, idx=None, sparse=False, encoding="onehot"):
+        """
+        Fit `model` on rows `idx` (all rows by default, CSR input with sparse=True)
+        and return a serving Pipeline: the stored encoder plus a scaler fitted on
+        the same rows.
+        """
+        idx = np.arange(len(self)) if idx is None else idx
+        scaler = self.scaler(idx)
+        model.fit(self.encode(idx, scaler, sparse, encoding), self.y[idx])
+
+        preprocessor = copy.deepcopy(self._categorical(encoding)[1])
+        preprocessor.named_transformers_["num"].steps = [("scaler", scaler)]
+        return Pipeline(steps=[
+            ("preprocessor", preprocessor),
+            ("model", model)
+        ])
+
+    def transform(self, pipeline, idx, sparse=False):
+        """Rows `idx` encoded for a pipeline returned by fit()."""
+        preprocessor = pipeline.named_steps["preprocessor"]
+        scaler = preprocessor.named_transformers_["num"].named_steps["scaler"]
+        encoding = preprocessor.named_transformers_["cat"].steps[-1][0]
+        return self.encode(idx, scaler, sparse, encoding)
+
+
+def load_design(mode, store_dir=FEATURE_STORE_DIR, data_path=RAW_DATA_PATH, mmap=True) -> DesignMatrix:
+    """The stored design matrix for `mode`, (re)built first if co2.csv (or the store layout) changed."""
+    directory = Path(store_dir) / mode.lower()
+    source_hash = file_hash(data_path)
+    meta_path = directory / "meta.json"
+    stale = True
+    if meta_path.exists():
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        stale = (
+            meta.get("source_sha256") != source_hash
+            or meta.get("encodings") != list(ENCODINGS)
+            or meta.get("numeric_dtype") != NUMERIC_DTYPE
+        )
+    if stale:
+        build_design(clean_data(load_raw_data(data_path)), mode, store_dir, source_hash)
+    return DesignMatrix(directory, mmap=mmap)
+
+
+if __name__ == "__main__":
+    from src.models.cv_engine import precompute_folds, default_cv
+
+    for mode in ["STRICT", "FULL"]:
+        start = time.perf_counter()
+        directory = build_design(clean_data(load_raw_data()), mode, source_hash=file_hash(RAW_DATA_PATH))
+        build_s = time.perf_counter() - start
+        size_kb = sum(p.stat().st_size for p in directory.glob("*.npy")) / 1024
+
+        # old path, once per script: read + clean + feature types + preprocessor per fold
+        start = time.perf_counter()
+        df = clean_data(pd.read_csv(RAW_DATA_PATH))
+        precompute_folds(df, FEATURE_SETS[mode], *get_feature_types(df, FEATURE_SETS[mode]), default_cv())
+        old_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        load_design(mode).folds(default_cv())
+        new_s = time.perf_counter() - start
+
+        design = load_design(mode)
+        print(
+            f"{mode:<6} {len(design)} x {len(design.columns)} | built in {build_s:.2f}s, {size_kb:.0f} KB | "
+            f"5 folds: csv + preprocessor {1000 * old_s:.0f} ms, store {1000 * new_s:.0f} ms"
+        )
@@ -0,0 +1,24 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from src.data.preprocess import clean_data
+from src.features.feature_store import load_design
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "raw" / "co2.csv"
+
+
+def test_design_fit_matches_dataframe_predict(tmp_path):
+    df = clean_data(pd.read_csv(DATA_PATH))    # float64, as served
+
+    for mode in ["STRICT", "FULL"]:
+        design = load_design(mode, store_dir=tmp_path, data_path=DATA_PATH)
+        for encoding in ["onehot", "ordinal"]:
+            pipe = design.fit(RandomForestRegressor(n_estimators=30, random_state=42, n_jobs=1), encoding=encoding)
+            Xt = design.transform(pipe, np.arange(len(design)))
+
+            expected = pipe.named_steps["model"].predict(Xt)
+            assert np.array_equal(pipe.predict(df[design.feature_set]), expected)
+            assert np.array_equal(pipe.predict(pd.DataFrame(design.rows(np.arange(len(design))))), expected)
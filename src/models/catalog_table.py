@@ -0,0 +1,226 @@
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.catalog import CATALOG_COLS
+from src.models.compiled_pipeline import CompiledPipeline, compile_pipeline
+from src.models.prediction_cache import normalize_row, cache_key
+from src.risk.risk_scoring import (
+    reason_codes, reasons_from_codes,
+    risk_category_from_co2_array, risk_score_from_co2_array
+)
+
+CATALOG_TABLE_PATH = Path("artifacts/models/catalog_predictions_v1.npz")
+REFERENCE_LIMIT = 200.0
+
+STRICT_COLS = CATALOG_COLS[:1] + CATALOG_COLS[2:7]
+FULL_COLS = STRICT_COLS + CATALOG_COLS[7:]
+
+
+def key_hash(key: tuple) -> int:
+    """Process-independent 64-bit hash of a prediction_cache.cache_key tuple."""
+    raw = "\x1f".join(str(v) for v in key).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "little", signed=True)
+
+
+def build_catalog_table(strict_model, full_model, catalog, reference_limit=REFERENCE_LIMIT, versions=None,
+                        hashes=None):
+    """
+    Run both models (sklearn pipelines, or CompiledPipelines as served) once
+    over every catalog spec and return the table columns.
+    Inputs are normalized exactly like the live prediction cache, so a table hit
+    returns the same value live inference would. For forests the decision-path
+    attributions per input feature are stored too (attr_<mode>, float32).
+    `hashes` ({mode: prediction_cache.artifact_hash}) ties the table to the exact
+    artifact files; without them CatalogTable.matches never accepts the table.
+    """
+    columns = {}
+    for col in CATALOG_COLS:
+        values = catalog[col].to_numpy()
+        columns[col] = values.astype(str) if values.dtype == object else values
+
+    for mode, model, cols in [("STRICT", strict_model, STRICT_COLS), ("FULL", full_model, FULL_COLS)]:
+        tag = mode.lower()
+        records = [normalize_row(row, mode) for row in catalog[cols].to_dict("records")]
+        rows = pd.DataFrame(records, columns=cols)
+
+        co2 = model.predict(rows)
+        columns[f"co2_{tag}"] = co2
+        columns[f"risk_score_{tag}"] = risk_score_from_co2_array(co2, reference_limit)
+        columns[f"compliance_{tag}"] = risk_category_from_co2_array(co2, reference_limit)
+        columns[f"reason_code_{tag}"] = reason_codes(rows, mode)
+        columns[f"key_hash_{tag}"] = np.array([key_hash(cache_key(r, mode)) for r in records], dtype=np.int64)
+
+        compiled = model if isinstance(model, CompiledPipeline) else compile_pipeline(model)
+        if compiled.is_forest:
+            bias, contrib = compiled.attribute(rows)
+            columns[f"attr_{tag}"] = contrib.astype(np.float32)
+            columns[f"attr_bias_{tag}"] = np.array(bias)
+            columns[f"attr_features_{tag}"] = np.array(compiled.input_features)
+
+    columns["reference_limit"] = np.array(reference_limit)
+    versions = versions or {}
+    columns["version_strict"] = np.array(versions.get("STRICT", ""))
+    columns["version_full"] = np.array(versions.get("FULL", ""))
+    hashes = hashes or {}
+    columns["hash_strict"] = np.array(hashes.get("STRICT", ""))
+    columns["hash_full"] = np.array(hashes.get("FULL", ""))
+    return columns
+
+
+def save_catalog_table(columns, path=CATALOG_TABLE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, **columns)
+
+
+def _model_id(version: str) -> str:
+    # "rf_strict_v1:v1@<mtime>" -> "rf_strict_v1:v1" (mtime changes on every copy/deploy)
+    return str(version).split("@")[0]
+
+
+class CatalogTable:
+    """
+    Precomputed predictions for every known catalog spec with O(1) lookup.
+
+    Risk category/score depend only on the predicted CO2 and the limit, so they
+    are re-derived for any user limit from the stored predictions.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.reference_limit = float(columns["reference_limit"])
+        self.versions = {
+            "STRICT": str(columns["version_strict"]),
+            "FULL": str(columns["version_full"]),
+        }
+        # tables saved before hashes were stored have none: never matched
+        self.hashes = {
+            "STRICT": str(columns["hash_strict"]) if "hash_strict" in columns else "",
+            "FULL": str(columns["hash_full"]) if "hash_full" in columns else "",
+        }
+        # later duplicates of a key map to the same prediction, first one wins
+        self.index = {}
+        for mode in ["STRICT", "FULL"]:
+            hashes = columns[f"key_hash_{mode.lower()}"].tolist()
+            self.index[mode] = dict(zip(reversed(hashes), reversed(range(len(hashes)))))
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.columns["co2_strict"])
+
+    @classmethod
+    def load(cls, path=CATALOG_TABLE_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def matches(self, mode: str, model) -> bool:
+        """
+        True if the table was built from the artifact `model` (a CompiledPipeline
+        from load_compiled_pipeline) was loaded from: same name/version and same
+        file contents. A retrain under the same name and meta version changes
+        the hash, so the stale table is refused.
+        """
+        mode = mode.upper()
+        stored = self.hashes[mode]
+        return (
+            bool(stored)
+            and stored == getattr(model, "content_hash", None)
+            and _model_id(self.versions[mode]) == _model_id(model.version)
+        )
+
+    def find(self, key: tuple, mode: str = "STRICT"):
+        """Row index of a normalized cache_key, or None if the spec is unknown."""
+        mode = mode.upper()
+        i = self.index[mode].get(key_hash(key))
+        if i is not None and self._row_key(i, mode) != key:
+            i = None  # 64-bit hash collision
+        with self._lock:
+            if i is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return i
+
+    def _row_key(self, i, mode):
+        cols = STRICT_COLS if mode == "STRICT" else FULL_COLS
+        row = normalize_row({c: self.columns[c][i] for c in cols}, mode)
+        return cache_key(row, mode)
+
+    def lookup(self, key: tuple, mode: str = "STRICT"):
+        """Predicted CO2 for a normalized cache_key, or None to fall back to live inference."""
+        i = self.find(key, mode)
+        if i is None:
+            return None
+        return float(self.columns[f"co2_{mode.lower()}"][i])
+
+    def attributions(self, i, mode: str = "STRICT"):
+        """(bias, {feature: g/km}) stored for row i, or None if the table has no attributions."""
+        tag = mode.lower()
+        if f"attr_{tag}" not in self.columns:
+            return None
+        features = self.columns[f"attr_features_{tag}"].tolist()
+        values = self.columns[f"attr_{tag}"][i].astype(np.float64).tolist()
+        return float(self.columns[f"attr_bias_{tag}"]), dict(zip(features, values))
+
+    def reasons(self, i, mode: str = "STRICT"):
+        return reasons_from_codes(self.columns[f"reason_code_{mode.lower()}"][i:i + 1], mode)[0]
+
+    def rethreshold(self, limit: float, mode: str = "STRICT"):
+        """Risk score and category of every catalog spec at a new limit, no model run."""
+        co2 = self.columns[f"co2_{mode.lower()}"]
+        return risk_score_from_co2_array(co2, limit), risk_category_from_co2_array(co2, limit)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "rows": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def load_catalog_table(path=CATALOG_TABLE_PATH):
+    """The table if it exists on disk, else None (live inference only)."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return CatalogTable.load(path)
+
+
+if __name__ == "__main__":
+    from src.data.catalog import load_catalog
+    from src.config import MODEL_MMAP, STRICT_MODEL, FULL_MODEL
+    from src.models.compiled_pipeline import load_compiled_pipeline
+
+    artifacts = Path("artifacts/models")
+
+    start = time.perf_counter()
+    catalog = load_catalog("data/raw/co2.csv")
+    # built from the same files the API / dashboard serve (CO2_MODEL_MMAP), so the
+    # stored versions and hashes match their CompiledPipeline
+    models = {
+        mode: load_compiled_pipeline(artifacts / f"{name}.joblib", mmap=MODEL_MMAP)
+        for mode, name in [("STRICT", STRICT_MODEL), ("FULL", FULL_MODEL)]
+    }
+    columns = build_catalog_table(
+        models["STRICT"],
+        models["FULL"],
+        catalog,
+        versions={mode: model.version for mode, model in models.items()},
+        hashes={mode: model.content_hash for mode, model in models.items()}
+    )
+    save_catalog_table(columns)
+
+    print(f"Catalog table saved: {CATALOG_TABLE_PATH}")
+    print(f" - specs: {len(catalog)}")
+    print(f" - size: {CATALOG_TABLE_PATH.stat().st_size / 1024:.0f} KB")
+    print(f" - built in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,233 @@
+import argparse
+import shutil
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from src.models.flat_forest import FlatForest
+
+ARTIFACTS = Path("artifacts/models")
+
+
+def node_depths(flat: FlatForest):
+    """Depth of every node (roots are 0), walking all trees level by level."""
+    depth = np.zeros(flat.n_nodes, dtype=np.int32)
+    frontier = np.asarray(flat.roots)
+    level = 0
+    while frontier.size:
+        depth[frontier] = level
+        internal = frontier[flat.feature[frontier] >= 0]
+        frontier = np.concatenate([flat.left[internal], flat.right[internal]])
+        level += 1
+    return depth
+
+
+def select_trees(per_tree, y, n_trees):
+    """
+    Greedy forward selection: repeatedly add the tree that most lowers the MAE
+    of the running mean on (per_tree, y). per_tree is (n_rows, n_all_trees)
+    from FlatForest.predict_per_tree. Returns tree positions in pick order.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    total = np.zeros(len(y))
+    chosen = []
+    available = np.ones(per_tree.shape[1], dtype=bool)
+
+    for k in range(1, n_trees + 1):
+        mae = np.abs((total[:, None] + per_tree) / k - y[:, None]).mean(axis=0)
+        mae[~available] = np.inf
+        best = int(np.argmin(mae))
+        chosen.append(best)
+        available[best] = False
+        total += per_tree[:, best]
+    return chosen
+
+
+def compact(flat: FlatForest, trees=None, max_depth=None, float32=False) -> FlatForest:
+    """
+    Smaller copy of a FlatForest:
+      trees     - keep only these tree positions (in this order)
+      max_depth - turn nodes at this depth into leaves; sklearn stores the mean
+                  target of every node, so a cut node predicts its subtree mean
+      float32   - thresholds/values as float32. Thresholds are rounded DOWN, so
+                  float32 inputs take exactly the same path as before; only the
+                  leaf values lose precision.
+    Unreachable nodes are dropped and child indices renumbered.
+    """
+    roots = np.asarray(flat.roots)[list(trees) if trees is not None else slice(None)]
+    feature = np.array(flat.feature)
+    depth = node_depths(flat)
+    if max_depth is not None:
+        feature[depth >= max_depth] = -1
+
+    # nodes reachable from the kept roots without passing a (new) leaf
+    keep = np.zeros(flat.n_nodes, dtype=bool)
+    frontier = roots
+    while frontier.size:
+        keep[frontier] = True
+        internal = frontier[feature[frontier] >= 0]
+        frontier = np.concatenate([flat.left[internal], flat.right[internal]])
+
+    new_id = np.cumsum(keep, dtype=np.int64) - 1
+    feature = feature[keep]
+    is_leaf = feature < 0
+    left = np.where(is_leaf, -1, new_id[np.asarray(flat.left)[keep]]).astype(np.int32)
+    right = np.where(is_leaf, -1, new_id[np.asarray(flat.right)[keep]]).astype(np.int32)
+    threshold = np.where(is_leaf, 0.0, np.asarray(flat.threshold)[keep])
+    value = np.asarray(flat.value)[keep]
+
+    if float32:
+        rounded = threshold.astype(np.float32)
+        too_high = rounded > threshold
+        rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+        threshold = rounded
+        value = value.astype(np.float32)
+
+    return FlatForest(
+        feature=feature.astype(np.int16 if flat.n_features < 2 ** 15 else np.int32),
+        threshold=threshold,
+        left=left,
+        right=right,
+        value=value,
+        roots=new_id[roots].astype(np.int32),
+        max_depth=min(flat.max_depth, max_depth) if max_depth is not None else flat.max_depth,
+        n_features=flat.n_features
+    )
+
+
+def dir_size(directory) -> int:
+    return sum(p.stat().st_size for p in Path(directory).iterdir())
+
+
+def measure(flat: FlatForest, directory, X_eval, y_eval, X_batch):
+    """Size / load / latency / throughput / MAE row of the report table."""
+    directory = Path(directory)
+    if directory.exists():
+        shutil.rmtree(directory)
+    flat.save(directory)
+
+    start = time.perf_counter()
+    loaded = FlatForest.load(directory, mmap_mode=None)
+    load_s = time.perf_counter() - start
+
+    row = X_eval[:1]
+    loaded.predict(row)
+    start = time.perf_counter()
+    for _ in range(200):
+        loaded.predict(row)
+    single_ms = (time.perf_counter() - start) / 200 * 1000
+
+    start = time.perf_counter()
+    loaded.predict(X_batch)
+    rows_s = len(X_batch) / (time.perf_counter() - start)
+
+    mae = float(np.abs(loaded.predict(X_eval) - y_eval).mean())
+    return {
+        "trees": loaded.n_trees,
+        "nodes": loaded.n_nodes,
+        "size_mb": dir_size(directory) / 2 ** 20,
+        "load_ms": load_s * 1000,
+        "single_ms": single_ms,
+        "rows_s": rows_s,
+        "MAE": mae,
+    }
+
+
+def compaction_report(pipeline, X_select, y_select, X_eval, y_eval, work_dir,
+                      tree_counts=(25, 50, 100), depth_caps=(12, 16, 20)):
+    """
+    Build compacted variants of a fitted preprocessor + RF pipeline and measure
+    each one. Trees are selected on (X_select, y_select); MAE is reported on
+    (X_eval, y_eval), which must not overlap the selection rows.
+    Returns (variants {name: FlatForest}, rows [dict]).
+    """
+    preprocessor = pipeline.named_steps["preprocessor"]
+    Xs = preprocessor.transform(X_select)
+    Xe = preprocessor.transform(X_eval)
+    y_eval = np.asarray(y_eval, dtype=np.float64)
+    X_batch = np.tile(Xe, (max(1, 10_000 // len(Xe)), 1))
+
+    flat = FlatForest.from_forest(pipeline.named_steps["model"])
+    order = select_trees(flat.predict_per_tree(Xs), y_select, max(tree_counts))
+
+    variants = {"original (float64)": flat, "float32": compact(flat, float32=True)}
+    for n in tree_counts:
+        variants[f"greedy {n} trees"] = compact(flat, trees=order[:n], float32=True)
+    for d in depth_caps:
+        variants[f"depth <= {d}"] = compact(flat, max_depth=d, float32=True)
+    for n in tree_counts:
+        for d in depth_caps:
+            variants[f"greedy {n} trees, depth <= {d}"] = compact(flat, trees=order[:n], max_depth=d, float32=True)
+
+    work_dir = Path(work_dir)
+    rows = []
+    for i, (name, variant) in enumerate(variants.items()):
+        rows.append(dict(variant=name, **measure(variant, work_dir / f"variant_{i}", Xe, y_eval, X_batch)))
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return variants, rows
+
+
+def pick_variant(rows, mae_budget):
+    """Smallest variant whose MAE is within `mae_budget` (relative) of the original."""
+    limit = rows[0]["MAE"] * (1 + mae_budget)
+    ok = [r for r in rows if r["MAE"] <= limit]
+    return min(ok, key=lambda r: r["size_mb"])
+
+
+def print_report(title, rows, joblib_mb, joblib_load_s):
+    print(f"\n===== {title} | joblib artifact {joblib_mb:.1f} MB, load {joblib_load_s * 1000:.0f} ms =====")
+    print(f"{'variant':<30} {'trees':>5} {'nodes':>9} {'size MB':>8} {'load ms':>8} "
+          f"{'1-row ms':>8} {'rows/s':>9} {'MAE':>8}")
+    for r in rows:
+        print(f"{r['variant']:<30} {r['trees']:>5} {r['nodes']:>9,} {r['size_mb']:>8.1f} {r['load_ms']:>8.1f} "
+              f"{r['single_ms']:>8.3f} {r['rows_s']:>9,.0f} {r['MAE']:>8.4f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compact the RF artifacts and report size/latency/MAE.")
+    parser.add_argument("--mode", choices=["STRICT", "FULL", "BOTH"], default="BOTH")
+    parser.add_argument("--mae-budget", type=float, default=0.02,
+                        help="Accepted relative MAE increase for the recommended variant")
+    parser.add_argument("--export", action="store_true",
+                        help="Write the recommended variant to rf_<mode>_v1.compact.flat/")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from src.data.load_data import load_raw_data
+    from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
+    from src.data.split import split_data
+
+    args = parse_args()
+    df = clean_data(load_raw_data())
+    modes = ["STRICT", "FULL"] if args.mode == "BOTH" else [args.mode]
+
+    for mode in modes:
+        feature_set = FEATURE_SET_STRICT if mode == "STRICT" else FEATURE_SET_FULL
+        model_path = ARTIFACTS / f"rf_{mode.lower()}_v1.joblib"
+
+        start = time.perf_counter()
+        pipe = joblib.load(model_path)
+        joblib_load_s = time.perf_counter() - start
+
+        # same holdout as save_final_models; half selects trees, half is reported
+        _, X_test, _, y_test = split_data(df[feature_set], df[TARGET])
+        half = len(X_test) // 2
+
+        variants, rows = compaction_report(
+            pipe, X_test[:half], y_test[:half], X_test[half:], y_test[half:],
+            work_dir=ARTIFACTS / f"_compact_{mode.lower()}"
+        )
+        print_report(f"rf_{mode.lower()}_v1", rows, model_path.stat().st_size / 2 ** 20, joblib_load_s)
+
+        best = pick_variant(rows, args.mae_budget)
+        print(f"\nSmallest within +{100 * args.mae_budget:.0f}% MAE: {best['variant']} "
+              f"({best['size_mb']:.1f} MB, MAE {best['MAE']:.4f})")
+
+        if args.export:
+            out = ARTIFACTS / f"rf_{mode.lower()}_v1.compact.flat"
+            variants[best["variant"]].save(out)
+            joblib.dump(pipe.named_steps["preprocessor"], out / "preprocessor.joblib")
+            print(f"Exported: {out}")
@@ -1,20 +1,19 @@
-import pandas as pd
+import io
+import time
+
+import joblib
 import numpy as np
 
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import KFold, cross_validate
+from sklearn.model_selection import KFold
 
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 
-from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
-from src.features.build_features import build_preprocessor
-
-
-def get_feature_types(df, feature_set):
-    numeric_features = [c for c in feature_set if df[c].dtype != "object"]
-    categorical_features = [c for c in feature_set if df[c].dtype == "object"]
-    return numeric_features, categorical_features
+from src.features.feature_store import load_design
+from src.models.compiled_pipeline import compile_pipeline
+from src.models.cv_engine import cross_validate_models
+from src.models.hist_gbm import hist_gbm, ENCODING as HGB_ENCODING
 
 
 def make_pipeline(preprocessor, model):
@@ -24,70 +23,97 @@ def make_pipeline(preprocessor, model):
     ])
 
 
-def evaluate_models_cv(df, feature_set, title="STRICT"):
-    X = df[feature_set]
-    y = df[TARGET]
-
-    numeric_features, categorical_features = get_feature_types(df, feature_set)
-    preprocessor = build_preprocessor(numeric_features, categorical_features)
-
-    models = {
-        "LinearRegression": LinearRegression(),
-        "RandomForest": RandomForestRegressor(
+def candidate_models(design):
+    """{name: (estimator, encoding)}; encoding picks the categorical block of the feature store."""
+    return {
+        "LinearRegression": (LinearRegression(), "onehot"),
+        "RandomForest": (RandomForestRegressor(
             n_estimators=300,
             random_state=42,
             n_jobs=-1
-        ),
-        "GradientBoosting": GradientBoostingRegressor(random_state=42)
+        ), "onehot"),
+        "GradientBoosting": (GradientBoostingRegressor(random_state=42), "onehot"),
+        "HistGradientBoosting": (hist_gbm(design), HGB_ENCODING),
+        # median regression: the quantile loss at 0.5 targets MAE directly
+        "HistGradientBoostingQ50": (hist_gbm(design, loss="quantile", quantile=0.5), HGB_ENCODING)
     }
 
-    cv = KFold(n_splits=5, shuffle=True, random_state=42)
 
-    # Use MAE as primary. sklearn gives NEGATIVE scores for losses.
-    scoring = {
-        "mae": "neg_mean_absolute_error",
-        "rmse": "neg_root_mean_squared_error",
-        "r2": "r2"
+def _median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def serving_profile(design, model, encoding="onehot", repeat=200):
+    """
+    Fit on the 80% train rows and measure what serving would see: joblib
+    artifact size, single-vehicle latency (CompiledPipeline.predict_row) and
+    one predict_rows call over the whole test split.
+    """
+    train_idx, test_idx = design.split()
+    pipe = design.fit(model, train_idx, encoding=encoding)
+
+    buffer = io.BytesIO()
+    joblib.dump(pipe, buffer)
+
+    compiled = compile_pipeline(pipe)
+    rows = design.rows(test_idx)
+    row_ms = _median_ms(lambda: compiled.predict_row(rows[0]), repeat)
+    batch_ms = _median_ms(lambda: compiled.predict_rows(rows), max(1, repeat // 20))
+
+    return {
+        "artifact_mb": buffer.getbuffer().nbytes / 1e6,
+        "row_ms": row_ms,
+        "batch_ms": batch_ms,
+        "batch_rows": len(rows),
     }
 
+
+def evaluate_models_cv(design, title="STRICT", n_jobs=-1, profile=True):
+    """
+    5-fold CV of the candidate models on a feature_store.DesignMatrix, plus
+    (profile=True) train time, artifact size and predict latency per model.
+    """
+    candidates = candidate_models(design)
+
+    cv = KFold(n_splits=5, shuffle=True, random_state=42)
+
     print(f"\n===== {title} FEATURE SET | 5-FOLD CV =====")
 
+    # Categorical block comes precomputed from the feature store, the scaler is
+    # fitted once per fold and shared by all models of an encoding; (model, fold)
+    # jobs run on one pool, each model single-threaded inside it.
     results = []
-    for name, model in models.items():
-        pipe = make_pipeline(preprocessor, model)
-
-        scores = cross_validate(
-            pipe, X, y,
-            cv=cv,
-            scoring=scoring,
-            n_jobs=-1,
-            return_train_score=False
-        )
-
-        mae = -scores["test_mae"]
-        rmse = -scores["test_rmse"]
-        r2 = scores["test_r2"]
+    for encoding in dict.fromkeys(enc for _, enc in candidates.values()):
+        models = {name: model for name, (model, enc) in candidates.items() if enc == encoding}
+        results += cross_validate_models(models, design.folds(cv, encoding=encoding), n_jobs=n_jobs)
 
-        results.append({
-            "model": name,
-            "MAE_mean": mae.mean(),
-            "MAE_std": mae.std(),
-            "RMSE_mean": rmse.mean(),
-            "RMSE_std": rmse.std(),
-            "R2_mean": r2.mean(),
-            "R2_std": r2.std()
-        })
+    if profile:
+        for r in results:
+            model, encoding = candidates[r["model"]]
+            r.update(serving_profile(design, model, encoding))
 
     # Sort by MAE (lower better)
     results = sorted(results, key=lambda x: x["MAE_mean"])
 
     for r in results:
-        print(
-            f"{r['model']:<18} | "
+        line = (
+            f"{r['model']:<23} | "
             f"MAE {r['MAE_mean']:.3f} ± {r['MAE_std']:.3f} | "
             f"RMSE {r['RMSE_mean']:.3f} ± {r['RMSE_std']:.3f} | "
-            f"R2 {r['R2_mean']:.4f} ± {r['R2_std']:.4f}"
+            f"R2 {r['R2_mean']:.4f} ± {r['R2_std']:.4f} | "
+            f"fit {r['fit_s']:.2f}s"
         )
+        if profile:
+            line += (
+                f" | {r['artifact_mb']:.2f} MB | "
+                f"row {r['row_ms']:.3f} ms | batch({r['batch_rows']}) {r['batch_ms']:.1f} ms"
+            )
+        print(line)
 
     best = results[0]
     print(f"\nBest for {title}: {best['model']} (lowest MAE)\n")
@@ -96,8 +122,5 @@ def evaluate_models_cv(df, feature_set, title="STRICT"):
 
 
 if __name__ == "__main__":
-    df = pd.read_csv("D:/ML_PROJECTS/co2-risk-platform/data/raw/co2.csv")
-    df = clean_data(df)
-
-    evaluate_models_cv(df, FEATURE_SET_STRICT, title="STRICT")
-    evaluate_models_cv(df, FEATURE_SET_FULL, title="FULL")
+    evaluate_models_cv(load_design("STRICT"), title="STRICT")
+    evaluate_models_cv(load_design("FULL"), title="FULL")
@@ -0,0 +1,282 @@
+import threading
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from src.models.flat_forest import FlatForest, is_forest
+from src.models.prediction_cache import artifact_hash, artifact_version
+from src.utils.metrics import stage
+
+
+def _infrequent_categories(encoder):
+    try:
+        return encoder.infrequent_categories_
+    except AttributeError:  # fitted without min_frequency / max_categories
+        return [None] * len(encoder.categories_)
+
+
+def _category_layout(transformer, offset):
+    """
+    Encoded positions of a fitted build_preprocessor "cat" step, starting at
+    column `offset`: per feature {category: (column, value)} and the entry for
+    unseen categories (None = leave zeros). Frequent categories keep their
+    categories_ order; an infrequent group is the feature's last one-hot column
+    or the next ordinal code, as in sklearn. Returns (indexes, unknown, offset).
+    """
+    step, encoder = transformer.steps[-1]
+    indexes, unknown = [], []
+    for categories, infrequent in zip(encoder.categories_, _infrequent_categories(encoder)):
+        infrequent = [] if infrequent is None else list(infrequent)
+        rare = set(infrequent)
+        frequent = [c for c in categories if c not in rare]
+
+        if step == "onehot":
+            if encoder.drop is not None:
+                raise ValueError("OneHotEncoder(drop=...) is not supported")
+            index = {value: (offset + i, 1.0) for i, value in enumerate(frequent)}
+            group = (offset + len(frequent), 1.0) if infrequent else None
+            unknown.append(group if encoder.handle_unknown == "infrequent_if_exist" else None)
+            offset += len(frequent) + (1 if infrequent else 0)
+        elif step == "ordinal":
+            if encoder.handle_unknown != "use_encoded_value":
+                raise ValueError("OrdinalEncoder needs handle_unknown='use_encoded_value'")
+            index = {value: (offset, float(i)) for i, value in enumerate(frequent)}
+            group = (offset, float(len(frequent)))
+            unknown.append((offset, float(encoder.unknown_value)))
+            offset += 1
+        else:
+            raise ValueError(f"Unsupported categorical encoder: {step}")
+
+        index.update({value: group for value in infrequent})
+        indexes.append(index)
+    return indexes, unknown, offset
+
+
+class CompiledPipeline:
+    """
+    Fast single-row inference for a fitted preprocessor + model pipeline
+    (the layout produced by build_features.build_preprocessor).
+
+    StandardScaler means/scales and one-hot positions are precomputed once, so a
+    vehicle dict is encoded straight into a float64 NumPy row without building a
+    DataFrame or going through the ColumnTransformer. Forests are evaluated with
+    FlatForest, so results match Pipeline.predict bit-for-bit; other models
+    (e.g. HistGradientBoosting) get the encoded rows through their own predict.
+
+    `model` is the fitted sklearn estimator; it is None when the forest is served
+    from memory-mapped FlatForest arrays (see load_compiled_pipeline).
+    """
+
+    def __init__(self, preprocessor, model=None, flat=None, version=None, content_hash=None):
+        self.preprocessor = preprocessor
+        self.model = model
+        if flat is None and is_forest(model):
+            flat = FlatForest.from_forest(model)
+        self.flat = flat
+        # identifies the loaded artifact (used to invalidate prediction caches)
+        self.version = version
+        # sha256 of the files it was loaded from (catalog tables are only used for the same bytes)
+        self.content_hash = content_hash
+
+        self.numeric_features = []
+        self.categorical_features = []
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == "remainder":
+                continue
+            if name == "num":
+                scaler = transformer.named_steps["scaler"]
+                self.numeric_features = list(columns)
+                self.num_slice = slice(offset, offset + len(columns))
+                self.mean = np.asarray(scaler.mean_, dtype=np.float64)
+                self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+                offset += len(columns)
+            elif name == "cat":
+                self.categorical_features = list(columns)
+                # category value -> (absolute column, value) in the encoded row
+                self.category_index, self.unknown_entry, offset = _category_layout(transformer, offset)
+            else:
+                raise ValueError(f"Unsupported transformer in preprocessor: {name}")
+
+        self.n_features = offset
+        self._local = threading.local()
+
+        # encoded column -> position of its input feature in input_features (attributions)
+        self.input_features = self.numeric_features + self.categorical_features
+        self.column_feature = np.zeros(self.n_features, dtype=np.intp)
+        self.column_feature[self.num_slice] = np.arange(len(self.numeric_features))
+        for i, (index, unknown) in enumerate(zip(self.category_index, self.unknown_entry), len(self.numeric_features)):
+            entries = list(index.values()) + ([unknown] if unknown is not None else [])
+            self.column_feature[[column for column, _ in entries]] = i
+
+    def _buffer(self):
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = np.zeros((1, self.n_features), dtype=np.float64)
+            self._local.row = row
+        return row
+
+    def encode(self, row: dict):
+        """
+        Encode one vehicle (same keys as the training DataFrame columns) into the
+        preprocessor's output layout. Unknown categories encode like the fitted
+        encoder does (all zeros for OneHotEncoder(handle_unknown='ignore')).
+        The returned array is a per-thread buffer reused by the next call.
+        """
+        X = self._buffer()
+        X.fill(0.0)
+
+        values = np.array([row[c] for c in self.numeric_features], dtype=np.float64)
+        values -= self.mean
+        values /= self.scale
+        X[0, self.num_slice] = values
+
+        for column, index, unknown in zip(self.categorical_features, self.category_index, self.unknown_entry):
+            entry = index.get(row[column], unknown)
+            if entry is not None:
+                X[0, entry[0]] = entry[1]
+
+        return X
+
+    def encode_rows(self, rows: list):
+        """Encode a list of vehicle dicts into a new (n_rows, n_features) array, same layout as encode()."""
+        X = np.zeros((len(rows), self.n_features), dtype=np.float64)
+
+        values = np.array([[row[c] for c in self.numeric_features] for row in rows], dtype=np.float64)
+        values -= self.mean
+        values /= self.scale
+        X[:, self.num_slice] = values
+
+        for column, index, unknown in zip(self.categorical_features, self.category_index, self.unknown_entry):
+            for i, row in enumerate(rows):
+                entry = index.get(row[column], unknown)
+                if entry is not None:
+                    X[i, entry[0]] = entry[1]
+
+        return X
+
+    def predict_encoded(self, X):
+        """
+        Model prediction on already-encoded rows, skipping sklearn's input
+        validation and joblib dispatch for forests.
+        """
+        if self.flat is None:
+            return self.model.predict(X)
+        return self.flat.predict(X)
+
+    def predict_row(self, row: dict) -> float:
+        with stage("preprocess"):
+            X = self.encode(row)
+        with stage("predict"):
+            return float(self.predict_encoded(X)[0])
+
+    def predict_rows(self, rows: list):
+        """Many vehicle dicts in one forest call (e.g. coalesced API requests)."""
+        with stage("preprocess"):
+            X = self.encode_rows(rows)
+        with stage("predict"):
+            return self.predict_encoded(X)
+
+    @property
+    def is_forest(self) -> bool:
+        """Served by FlatForest, so per-tree spread and attributions are available."""
+        return self.flat is not None
+
+    def _require_forest(self, what):
+        if self.flat is None:
+            raise ValueError(f"{what} need a forest model (FlatForest).")
+
+    def predict_interval_rows(self, rows: list, quantiles=(0.1, 0.9)):
+        """(mean, std, quantiles) per vehicle dict, see FlatForest.predict_interval."""
+        self._require_forest("Prediction intervals")
+        with stage("preprocess"):
+            X = self.encode_rows(rows)
+        with stage("predict"):
+            return self.flat.predict_interval(X, quantiles)
+
+    def predict_interval(self, X, quantiles=(0.1, 0.9)):
+        """predict_interval_rows for DataFrame input (batches)."""
+        self._require_forest("Prediction intervals")
+        with stage("preprocess"):
+            Xt = self.preprocessor.transform(X)
+        with stage("predict"):
+            return self.flat.predict_interval(Xt, quantiles)
+
+    def attribute_rows(self, rows: list):
+        """
+        Decision-path attributions per vehicle dict, one-hot columns summed back
+        to their input feature: (bias, contrib) with contrib of shape
+        (n_rows, len(input_features)); bias + contrib.sum(axis=1) is the prediction.
+        """
+        self._require_forest("Attributions")
+        with stage("preprocess"):
+            X = self.encode_rows(rows)
+        with stage("attribute"):
+            return self.flat.contributions(X, self.column_feature, len(self.input_features))
+
+    def attribute(self, X):
+        """attribute_rows for DataFrame input (batches)."""
+        self._require_forest("Attributions")
+        with stage("preprocess"):
+            Xt = self.preprocessor.transform(X)
+        with stage("attribute"):
+            return self.flat.contributions(Xt, self.column_feature, len(self.input_features))
+
+    def predict(self, X):
+        """
+        DataFrame input (batches): ColumnTransformer, then the sklearn forest if it
+        is loaded (its compiled loop is fastest on large batches), else FlatForest.
+        """
+        with stage("preprocess"):
+            Xt = self.preprocessor.transform(X)
+        with stage("predict"):
+            if self.model is not None:
+                return self.model.predict(Xt)
+            return self.flat.predict(Xt)
+
+
+def compile_pipeline(pipeline, version=None) -> CompiledPipeline:
+    return CompiledPipeline(
+        pipeline.named_steps["preprocessor"],
+        pipeline.named_steps["model"],
+        version=version
+    )
+
+
+def serving_dir(model_path) -> Path:
+    """artifacts/models/rf_strict_v1.joblib -> artifacts/models/rf_strict_v1.flat/"""
+    return Path(model_path).with_suffix(".flat")
+
+
+def export_serving_artifacts(pipeline, directory):
+    """
+    mmap-friendly copy of a fitted RF pipeline: the forest as flat .npy arrays
+    plus the (small) fitted preprocessor.
+    """
+    directory = Path(directory)
+    FlatForest.from_forest(pipeline.named_steps["model"]).save(directory)
+    joblib.dump(pipeline.named_steps["preprocessor"], directory / "preprocessor.joblib")
+
+
+def load_compiled_pipeline(model_path, mmap=True) -> CompiledPipeline:
+    """
+    Load a model for serving. If its .flat/ export exists (and mmap is on), the
+    forest arrays are memory-mapped read-only, so every worker process shares
+    one copy through the OS page cache; otherwise the joblib pipeline is loaded.
+    """
+    model_path = Path(model_path)
+    version = artifact_version(model_path, mmap)
+    content_hash = artifact_hash(model_path, mmap)
+    directory = serving_dir(model_path)
+
+    if mmap and directory.exists():
+        return CompiledPipeline(
+            joblib.load(directory / "preprocessor.joblib"),
+            flat=FlatForest.load(directory, mmap_mode="r"),
+            version=version,
+            content_hash=content_hash
+        )
+    compiled = compile_pipeline(joblib.load(model_path), version=version)
+    compiled.content_hash = content_hash
+    return compiled
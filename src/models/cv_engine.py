@@ -0,0 +1,243 @@
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold, ParameterGrid
+from sklearn.pipeline import Pipeline
+
+from src.data.preprocess import TARGET
+from src.features.build_features import build_preprocessor
+
+
+def precompute_folds(df, feature_set, numeric_features, categorical_features, cv, **encoding):
+    """
+    Fit the preprocessor once per fold and keep the encoded train/test matrices.
+    Every model / grid point then reuses them instead of refitting the
+    ColumnTransformer for each (model, fold) pair. `encoding` goes to
+    build_preprocessor (e.g. sparse=True, encoding="ordinal").
+    """
+    X = df[feature_set]
+    y = df[TARGET].to_numpy()
+
+    folds = []
+    for train_idx, test_idx in cv.split(X, y):
+        preprocessor = build_preprocessor(numeric_features, categorical_features, **encoding)
+        X_train = preprocessor.fit_transform(X.iloc[train_idx])
+        X_test = preprocessor.transform(X.iloc[test_idx])
+        folds.append((X_train, y[train_idx], X_test, y[test_idx]))
+    return folds
+
+
+def single_threaded(model):
+    """Clone of `model` with its own n_jobs set to 1 (parallelism is across jobs, not inside them)."""
+    model = clone(model)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)
+    return model
+
+
+def _score(model, X_test, y_test, start_cpu):
+    pred = model.predict(X_test)
+    return {
+        "mae": mean_absolute_error(y_test, pred),
+        "rmse": np.sqrt(mean_squared_error(y_test, pred)),
+        "r2": r2_score(y_test, pred),
+        "cpu_s": time.process_time() - start_cpu,
+    }
+
+
+def _fit_and_score(model, fold):
+    start = time.process_time()
+    X_train, y_train, X_test, y_test = fold
+    fit_start = time.perf_counter()
+    model = single_threaded(model).fit(X_train, y_train)
+    fit_s = time.perf_counter() - fit_start
+    return dict(_score(model, X_test, y_test, start), fit_s=fit_s)
+
+
+def run_jobs(models, folds, n_jobs=-1):
+    """
+    Score every (model, fold) pair on ONE flat worker pool.
+    `models` is a list of estimators; returns one list of fold scores per model.
+    """
+    jobs = [(m, f) for m in range(len(models)) for f in range(len(folds))]
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_and_score)(models[m], folds[f]) for m, f in jobs
+    )
+
+    per_model = [[] for _ in models]
+    for (m, _), s in zip(jobs, scores):
+        per_model[m].append(s)
+    return per_model
+
+
+def summarize(name, fold_scores):
+    """Same result dict as compare_models.evaluate_models_cv."""
+    mae = np.array([s["mae"] for s in fold_scores])
+    rmse = np.array([s["rmse"] for s in fold_scores])
+    r2 = np.array([s["r2"] for s in fold_scores])
+    return {
+        "model": name,
+        "MAE_mean": mae.mean(),
+        "MAE_std": mae.std(),
+        "RMSE_mean": rmse.mean(),
+        "RMSE_std": rmse.std(),
+        "R2_mean": r2.mean(),
+        "R2_std": r2.std(),
+        "fit_s": float(np.mean([s["fit_s"] for s in fold_scores]))
+    }
+
+
+def cross_validate_models(models: dict, folds, n_jobs=-1):
+    """{name: estimator} -> list of result dicts (unsorted, in dict order)."""
+    names = list(models)
+    per_model = run_jobs([models[n] for n in names], folds, n_jobs=n_jobs)
+    return [summarize(name, scores) for name, scores in zip(names, per_model)]
+
+
+def grid_search(model, param_grid, folds, n_jobs=-1):
+    """
+    GridSearchCV-style search over precomputed folds, scored by MAE.
+    `param_grid` uses plain estimator parameter names (no "model__" prefix).
+    Returns (best_params, best_mae, all_results); ties go to the first
+    candidate in ParameterGrid order, like GridSearchCV.
+    """
+    candidates = list(ParameterGrid(param_grid))
+    per_candidate = run_jobs([clone(model).set_params(**p) for p in candidates], folds, n_jobs=n_jobs)
+
+    results = []
+    for params, scores in zip(candidates, per_candidate):
+        results.append({
+            "params": params,
+            "MAE_mean": float(np.mean([s["mae"] for s in scores])),
+            "cpu_s": sum(s["cpu_s"] for s in scores),
+        })
+
+    best = min(range(len(results)), key=lambda i: results[i]["MAE_mean"])
+    return results[best]["params"], results[best]["MAE_mean"], results
+
+
+def _grow_and_score(model, fold, n_estimators):
+    # warm_start forest: only the trees beyond the current size are fitted
+    start = time.process_time()
+    X_train, y_train, X_test, y_test = fold
+    model.set_params(n_estimators=n_estimators)
+    model.fit(X_train, y_train)
+    return model, _score(model, X_test, y_test, start)
+
+
+def halving_search(model, param_grid, folds, min_estimators=25, max_estimators=300,
+                   factor=3, tol=0.005, n_jobs=-1):
+    """
+    Successive halving over forest size for a warm-start-capable forest.
+
+    Every config in `param_grid` (plain parameter names, no n_estimators) starts
+    with `min_estimators` trees per fold. After each round the best 1/`factor`
+    configs survive and their forests grow to `factor` times as many trees
+    (capped at `max_estimators`) by adding trees to the ones already fitted.
+    With a fixed random_state a grown forest is identical to one trained at that
+    size from scratch.
+
+    Stops once the survivors reach `max_estimators`, or when the best MAE
+    improves by less than `tol` (relative) from one round to the next.
+    Returns (best_params incl. n_estimators, best_mae, rounds).
+    """
+    candidates = list(ParameterGrid(param_grid))
+    forests = {
+        (c, f): single_threaded(model).set_params(warm_start=True, **candidates[c])
+        for c in range(len(candidates)) for f in range(len(folds))
+    }
+
+    alive = list(range(len(candidates)))
+    n_estimators = min_estimators
+    rounds = []
+    best = None
+
+    while True:
+        jobs = [(c, f) for c in alive for f in range(len(folds))]
+        out = Parallel(n_jobs=n_jobs)(
+            delayed(_grow_and_score)(forests[c, f], folds[f], n_estimators) for c, f in jobs
+        )
+
+        maes = {c: [] for c in alive}
+        cpu_s = 0.0
+        for (c, f), (forest, scores) in zip(jobs, out):
+            forests[c, f] = forest  # fitted copy back from the worker
+            maes[c].append(scores["mae"])
+            cpu_s += scores["cpu_s"]
+
+        ranked = sorted(alive, key=lambda c: np.mean(maes[c]))
+        round_best = float(np.mean(maes[ranked[0]]))
+        rounds.append({
+            "n_estimators": n_estimators,
+            "candidates": len(alive),
+            "best_MAE": round_best,
+            "cpu_s": cpu_s,
+        })
+
+        improved = best is None or round_best < best[1] * (1 - tol)
+        if best is None or round_best < best[1]:
+            best = (dict(candidates[ranked[0]], n_estimators=n_estimators), round_best)
+
+        if not improved or n_estimators >= max_estimators:
+            break
+
+        # promote the top configs and give them more trees; drop the rest
+        keep = ranked[:max(1, int(np.ceil(len(alive) / factor)))]
+        for c in alive:
+            if c not in keep:
+                for f in range(len(folds)):
+                    del forests[c, f]
+        alive = keep
+        n_estimators = min(n_estimators * factor, max_estimators)
+
+    return best[0], best[1], rounds
+
+
+def default_cv(n_splits=5, shuffle=True, random_state=42):
+    return KFold(n_splits=n_splits, shuffle=shuffle, random_state=random_state if shuffle else None)
+
+
+def refit_pipeline(df, feature_set, numeric_features, categorical_features, model, **encoding):
+    """Final preprocessor + model pipeline fitted on all rows."""
+    pipe = Pipeline(steps=[
+        ("preprocessor", build_preprocessor(numeric_features, categorical_features, **encoding)),
+        ("model", model)
+    ])
+    return pipe.fit(df[feature_set], df[TARGET])
+
+
+if __name__ == "__main__":
+    from sklearn.model_selection import cross_validate
+    from sklearn.ensemble import RandomForestRegressor
+    from src.data.load_data import load_raw_data
+    from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL
+    from src.features.build_features import get_feature_types
+    from src.models.compare_models import make_pipeline
+
+    df = clean_data(load_raw_data())
+    cv = default_cv()
+
+    for title, feature_set in [("STRICT", FEATURE_SET_STRICT), ("FULL", FEATURE_SET_FULL)]:
+        num_cols, cat_cols = get_feature_types(df, feature_set)
+        rf = RandomForestRegressor(n_estimators=300, random_state=42, n_jobs=-1)
+
+        # old path: pipeline refit per fold, RF n_jobs=-1 nested in cross_validate n_jobs=-1
+        start = time.perf_counter()
+        old = cross_validate(
+            make_pipeline(build_preprocessor(num_cols, cat_cols), rf),
+            df[feature_set], df[TARGET], cv=cv, scoring="neg_mean_absolute_error", n_jobs=-1
+        )
+        old_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        folds = precompute_folds(df, feature_set, num_cols, cat_cols, cv)
+        new = cross_validate_models({"RandomForest": rf}, folds)[0]
+        new_s = time.perf_counter() - start
+
+        print(
+            f"{title:<6} RF 5-fold | nested {old_s:6.1f}s | engine {new_s:6.1f}s | "
+            f"MAE {-old['test_score'].mean():.4f} vs {new['MAE_mean']:.4f}"
+        )
@@ -1,7 +1,11 @@
+import time
+
 import joblib
 import pandas as pd
 from pathlib import Path
 
+from src.models.compiled_pipeline import compile_pipeline
+
 
 def load_model(path):
     return joblib.load(path)
@@ -31,6 +35,20 @@ def get_feature_importance(model_pipeline, top_n=15):
     return fi
 
 
+def get_vehicle_attributions(model_pipeline, X: pd.DataFrame):
+    """
+    Per-vehicle decision-path attributions of a forest pipeline: one column per
+    input feature (one-hot columns summed back to Make, Vehicle Class, ...),
+    in g/km relative to the training average, plus the "bias" (that average).
+    bias + the feature columns add up to the prediction.
+    """
+    compiled = compile_pipeline(model_pipeline)
+    bias, contrib = compiled.attribute(X)
+    out = pd.DataFrame(contrib, columns=compiled.input_features, index=X.index)
+    out.insert(0, "bias", bias)
+    return out
+
+
 if __name__ == "__main__":
     artifacts = Path("artifacts/models")
 
@@ -45,3 +63,21 @@ if __name__ == "__main__":
 
     print("\n=== FULL MODEL FEATURE IMPORTANCE ===")
     print(full_fi)
+
+    from src.data.load_data import load_raw_data
+    from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL
+
+    df = clean_data(load_raw_data())
+    for title, model, feature_set in [("STRICT", strict_model, FEATURE_SET_STRICT), ("FULL", full_model, FEATURE_SET_FULL)]:
+        compiled = compile_pipeline(model)
+        print(f"\n=== {title} MODEL PER-VEHICLE ATTRIBUTIONS (mean |g/km|) ===")
+        print(get_vehicle_attributions(model, df[feature_set]).drop(columns="bias").abs().mean().sort_values(ascending=False))
+
+        rows = df[feature_set].to_dict("records")
+        for n in [1, 10, 100, 1000]:
+            repeat = max(1, 100 // n)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                compiled.attribute_rows(rows[:n])
+            ms = (time.perf_counter() - start) / repeat * 1000
+            print(f"{n:>5} vehicles: {ms:8.2f} ms ({ms / n:.3f} ms per vehicle)")
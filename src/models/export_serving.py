@@ -0,0 +1,55 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import joblib
+
+from src.models.compiled_pipeline import export_serving_artifacts, serving_dir
+
+ARTIFACTS = Path("artifacts/models")
+MODEL_NAMES = ["rf_strict_v1", "rf_full_v1"]
+
+# Run in a fresh interpreter: load both models like one API worker does, report time + memory
+_WORKER_PROBE = """
+import sys, time
+start = time.perf_counter()
+from src.models.compiled_pipeline import load_compiled_pipeline
+models = [load_compiled_pipeline(p, mmap=sys.argv[1] == "1") for p in sys.argv[2:]]
+row = {"Make": "TOYOTA", "Vehicle Class": "COMPACT", "Transmission": "AS6", "Fuel Type": "X",
+       "Engine Size(L)": 2.0, "Cylinders": 4, "Fuel Consumption Comb (L/100 km)": 7.5}
+for m in models:
+    m.predict_row(row)
+elapsed = time.perf_counter() - start
+status = dict(line.split(":", 1) for line in open("/proc/self/status") if ":" in line)
+kb = lambda k: int(status.get(k, "0 kB").split()[0])
+print(elapsed, kb("VmRSS"), kb("RssAnon"), kb("RssFile"))
+"""
+
+
+def probe_worker(model_paths, mmap: bool):
+    """Startup seconds and RSS / private (anon) / shared-file KB of one fresh worker process."""
+    out = subprocess.run(
+        [sys.executable, "-c", _WORKER_PROBE, "1" if mmap else "0", *map(str, model_paths)],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(out[0]), int(out[1]), int(out[2]), int(out[3])
+
+
+if __name__ == "__main__":
+    model_paths = [ARTIFACTS / f"{name}.joblib" for name in MODEL_NAMES]
+
+    for path in model_paths:
+        start = time.perf_counter()
+        export_serving_artifacts(joblib.load(path), serving_dir(path))
+        size_mb = sum(f.stat().st_size for f in serving_dir(path).iterdir()) / 1e6
+        print(f"Exported {serving_dir(path)} ({size_mb:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+    print("\n===== PER-WORKER STARTUP (both models, first prediction included) =====")
+    for label, mmap in [("joblib (before)", False), ("mmap .flat (after)", True)]:
+        probe_worker(model_paths, mmap)  # warm the OS page cache first
+        seconds, rss, anon, file_backed = probe_worker(model_paths, mmap)
+        print(
+            f"{label:<20} | startup {seconds:6.2f}s | RSS {rss / 1024:7.1f} MB | "
+            f"private {anon / 1024:7.1f} MB | shared file pages {file_backed / 1024:7.1f} MB"
+        )
@@ -0,0 +1,288 @@
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse as sp
+
+
+def _dense_float32(X):
+    """C-contiguous float32 rows; CSR input (build_preprocessor(sparse=True)) is densified."""
+    if sp.issparse(X):
+        X = X.toarray()
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
+def is_forest(model) -> bool:
+    """
+    A fitted averaging forest (RandomForest / ExtraTrees: estimators_ is a list
+    of trees). Boosting models keep estimators_ as an array of stages and are
+    not exported.
+    """
+    return isinstance(getattr(model, "estimators_", None), list)
+
+
+class FlatForest:
+    """
+    A fitted RandomForestRegressor exported to flat, contiguous NumPy arrays.
+
+    All trees are concatenated into one node table (feature, threshold, left,
+    right, value; leaves have feature == -1), so a batch of rows can walk every
+    tree at once, one level per step, with plain array indexing and no per-tree
+    Python loop.
+
+    Input is the dense output of build_features.build_preprocessor. As in
+    sklearn, rows are cast to float32 before comparing against the thresholds
+    and trees are summed in estimator order, so predictions match
+    RandomForestRegressor.predict exactly.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_forest(cls, forest):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, -1, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, -1, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, -1, tree.children_right + offset).astype(np.int32))
+            values.append(tree.value.reshape(n, -1)[:, 0])
+            roots.append(offset)
+
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=forest.n_features_in_
+        )
+
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+    def save(self, directory):
+        """
+        One uncompressed .npy per array plus forest.json, so load() can
+        memory-map the node table instead of unpickling it.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        with open(directory / "forest.json", "w", encoding="utf-8") as f:
+            json.dump({"max_depth": self.max_depth, "n_features": self.n_features}, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """
+        With mmap_mode="r" the arrays are read-only views of the files, so every
+        process serving the same model shares the pages through the OS page cache.
+        """
+        directory = Path(directory)
+        with open(directory / "forest.json", encoding="utf-8") as f:
+            info = json.load(f)
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode) for name in cls.ARRAYS}
+        return cls(**arrays, **info)
+
+    def apply(self, X):
+        """
+        Leaf node id reached in every tree: shape (n_rows, n_trees).
+
+        All (row, tree) pairs advance one level per step; pairs that reach a
+        leaf (feature == -1) are retired so later levels only touch the
+        still-active paths.
+        """
+        X32 = _dense_float32(X)
+        n_rows = X32.shape[0]
+        x_flat = X32.ravel()
+
+        leaves = np.empty(n_rows * self.n_trees, dtype=np.int32)
+        pair = np.arange(n_rows * self.n_trees)
+        node = np.tile(self.roots, n_rows)
+        row_start = np.repeat(np.arange(n_rows) * self.n_features, self.n_trees)
+
+        while pair.size:
+            feature = self.feature[node]
+            done = feature < 0
+            if done.any():
+                leaves[pair[done]] = node[done]
+                active = ~done
+                pair, node, row_start, feature = pair[active], node[active], row_start[active], feature[active]
+
+            go_left = x_flat[row_start + feature] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def contributions(self, X, groups=None, n_groups=None):
+        """
+        Decision-path (Saabas) attributions: every split on a row's path moves
+        the prediction from the node's mean to the child's mean, and that step
+        is credited to the split feature. Averaged over trees this gives
+        (bias, contrib) with
+            predict(X) == bias + contrib.sum(axis=1)   (up to float rounding)
+        where bias is the mean root value (the training-set mean).
+
+        `groups` maps each encoded column to an output column (e.g. all one-hot
+        columns of Make -> one "Make" column); default one per encoded column.
+        Walks the same level-by-level paths as apply(), so cost is linear in rows.
+        """
+        groups = np.arange(self.n_features) if groups is None else np.asarray(groups)
+        n_groups = int(groups.max()) + 1 if n_groups is None else int(n_groups)
+
+        X32 = _dense_float32(X)
+        n_rows = X32.shape[0]
+        x_flat = X32.ravel()
+
+        contrib = np.zeros(n_rows * n_groups, dtype=np.float64)
+        pair = np.arange(n_rows * self.n_trees)
+        node = np.tile(self.roots, n_rows)
+        row_start = np.repeat(np.arange(n_rows) * self.n_features, self.n_trees)
+        out_start = np.repeat(np.arange(n_rows) * n_groups, self.n_trees)
+
+        while pair.size:
+            feature = self.feature[node]
+            active = feature >= 0
+            if not active.all():
+                pair, node, row_start, out_start, feature = (
+                    pair[active], node[active], row_start[active], out_start[active], feature[active]
+                )
+                if not pair.size:
+                    break
+
+            go_left = x_flat[row_start + feature] <= self.threshold[node]
+            child = np.where(go_left, self.left[node], self.right[node])
+            contrib += np.bincount(
+                out_start + groups[feature],
+                weights=self.value[child] - self.value[node],
+                minlength=contrib.size
+            )
+            node = child
+
+        contrib /= self.n_trees
+        bias = float(np.mean(self.value[self.roots]))
+        return bias, contrib.reshape(n_rows, n_groups)
+
+    def predict_per_tree(self, X):
+        """Every tree's prediction: shape (n_rows, n_trees)."""
+        return self.value[self.apply(X)]
+
+    def predict(self, X, chunk_size=2048):
+        """
+        Mean over trees. Rows are processed in chunks to bound the
+        (rows x trees) working set; CSR input is densified one chunk at a time.
+        """
+        X = X.tocsr() if sp.issparse(X) else np.asarray(X)
+        out = np.empty(X.shape[0], dtype=np.float64)
+
+        for start in range(0, X.shape[0], chunk_size):
+            stop = start + chunk_size
+            per_tree = self.predict_per_tree(X[start:stop])
+            # cumsum accumulates sequentially, like sklearn's `y_hat += prediction`
+            # (in float64 also when the leaf values are stored as float32)
+            out[start:stop] = np.cumsum(per_tree, axis=1, dtype=np.float64)[:, -1]
+
+        out /= self.n_trees
+        return out
+
+    def predict_interval(self, X, quantiles=(0.1, 0.9), chunk_size=2048):
+        """
+        Mean over trees (same values as predict), standard deviation and
+        `quantiles` of the per-tree predictions, all from one apply() pass.
+        Returns (mean, std, q) with q of shape (n_rows, len(quantiles)).
+
+        The spread is how much the trees disagree about a vehicle, not a
+        calibrated prediction interval: each tree predicts a leaf mean, so
+        P10-P90 is narrower than the spread of actual CO2 values.
+        """
+        X = X.tocsr() if sp.issparse(X) else np.asarray(X)
+        mean = np.empty(X.shape[0], dtype=np.float64)
+        std = np.empty(X.shape[0], dtype=np.float64)
+        q = np.empty((X.shape[0], len(quantiles)), dtype=np.float64)
+
+        for start in range(0, X.shape[0], chunk_size):
+            stop = start + chunk_size
+            per_tree = self.predict_per_tree(X[start:stop])
+            mean[start:stop] = np.cumsum(per_tree, axis=1, dtype=np.float64)[:, -1]
+            std[start:stop] = per_tree.std(axis=1)
+            q[start:stop] = np.quantile(per_tree, quantiles, axis=1).T
+
+        mean /= self.n_trees
+        return mean, std, q
+
+
+def flatten_pipeline(pipeline) -> FlatForest:
+    return FlatForest.from_forest(pipeline.named_steps["model"])
+
+
+def _time_per_call(fn, X, repeat):
+    fn(X)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    import joblib
+    from src.data.load_data import load_raw_data
+    from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL
+
+    artifacts = Path("artifacts/models")
+    df = clean_data(load_raw_data())
+
+    for title, feature_set in [("strict", FEATURE_SET_STRICT), ("full", FEATURE_SET_FULL)]:
+        pipe = joblib.load(artifacts / f"rf_{title}_v1.joblib")
+        forest = pipe.named_steps["model"]
+
+        start = time.perf_counter()
+        flat = flatten_pipeline(pipe)
+        build_s = time.perf_counter() - start
+
+        print(f"\n===== rf_{title}_v1 | {flat.n_trees} trees, {flat.n_nodes} nodes, "
+              f"depth {flat.max_depth} | flattened in {build_s:.2f}s =====")
+
+        for batch_size in [1, 100, 100_000]:
+            rows = df[feature_set].sample(batch_size, replace=True, random_state=42)
+            X = pipe.named_steps["preprocessor"].transform(rows)
+            repeat = 20 if batch_size < 1000 else 1
+
+            sk_s = _time_per_call(forest.predict, X, repeat)
+            flat_s = _time_per_call(flat.predict, X, repeat)
+            same = np.array_equal(forest.predict(X), flat.predict(X))
+
+            print(
+                f"batch {batch_size:>7} | "
+                f"sklearn {batch_size / sk_s:>12,.0f} rows/s | "
+                f"flat {batch_size / flat_s:>12,.0f} rows/s | "
+                f"speedup x{sk_s / flat_s:.1f} | identical {same}"
+            )
@@ -0,0 +1,242 @@
+import argparse
+import copy
+import json
+import time
+from math import sqrt
+from pathlib import Path
+
+import joblib
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from src.data.load_data import load_raw_data, read_csv_typed
+from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
+from src.data.split import split_data
+from src.models.save_final_models import save_artifacts
+
+ARTIFACTS = Path("artifacts/models")
+FEATURE_SETS = {"STRICT": FEATURE_SET_STRICT, "FULL": FEATURE_SET_FULL}
+
+# trees added per incremental run, replayed old rows per new row
+N_NEW_TREES = 30
+REPLAY_RATIO = 3
+# accepted holdout MAE increase vs the parent model (relative)
+MAE_TOLERANCE = 0.05
+
+
+def unseen_categories(pipeline, rows: pd.DataFrame) -> dict:
+    """{column: [values]} the fitted categorical encoder has never seen."""
+    preprocessor = pipeline.named_steps["preprocessor"]
+    unseen = {}
+    for name, transformer, columns in preprocessor.transformers_:
+        if name != "cat":
+            continue
+        encoder = transformer.steps[-1][1]
+        for column, categories in zip(columns, encoder.categories_):
+            new = sorted(set(rows[column].astype(str)) - set(categories.astype(str)))
+            if new:
+                unseen[column] = new
+    return unseen
+
+
+def holdout_metrics(pipeline, X_test, y_test) -> dict:
+    preds = pipeline.predict(X_test)
+    return {
+        "MAE": mean_absolute_error(y_test, preds),
+        "MSE": mean_squared_error(y_test, preds),
+        "RMSE": sqrt(mean_squared_error(y_test, preds)),
+        "R2": r2_score(y_test, preds)
+    }
+
+
+def incremental_fit(pipeline, new_X, new_y, replay_X, replay_y, n_new_trees=N_NEW_TREES,
+                    replay_ratio=REPLAY_RATIO, on_unseen="error", random_state=42):
+    """
+    Copy of a fitted preprocessor + RandomForest pipeline with `n_new_trees`
+    extra trees, trained (warm_start) on the new rows plus a replay sample of
+    the old training rows. The preprocessor and the existing trees are kept
+    as they are.
+
+    Categories the OneHotEncoder has not seen cannot get their own columns
+    without refitting every tree, so `on_unseen` decides:
+      "error"  - raise ValueError (default; do a full retrain instead)
+      "ignore" - keep them encoded as all zeros, like at prediction time
+    """
+    unseen = unseen_categories(pipeline, new_X)
+    if unseen and on_unseen != "ignore":
+        raise ValueError(f"New rows have categories unknown to the fitted encoder: {unseen}")
+
+    n_replay = min(len(replay_X), replay_ratio * len(new_X))
+    replay = replay_X.sample(n_replay, random_state=random_state).index
+    X = pd.concat([new_X, replay_X.loc[replay]])
+    y = pd.concat([new_y, replay_y.loc[replay]])
+
+    pipeline = copy.deepcopy(pipeline)
+    forest = pipeline.named_steps["model"]
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees)
+    forest.fit(pipeline.named_steps["preprocessor"].transform(X), y)
+    forest.set_params(warm_start=False)
+
+    info = {
+        "new_rows": len(new_X),
+        "replay_rows": n_replay,
+        "added_trees": n_new_trees,
+        "total_trees": len(forest.estimators_),
+        "unseen_categories": unseen,
+    }
+    return pipeline, info
+
+
+def next_version(version: str) -> str:
+    """"v1" -> "v2"."""
+    return f"v{int(str(version).lstrip('v')) + 1}"
+
+
+def retrain(mode, new_csv, base_csv="data/raw/co2.csv", parent="v1", on_unseen="error", force=False):
+    """
+    Incremental retrain of rf_<mode>_<parent>: add trees for the rows in
+    `new_csv` and save the result as the next version, with lineage in its
+    .meta.json. An existing next-version artifact is only overwritten with force=True.
+
+    Holdout = the parent's holdout split of `base_csv` plus 20% of the new rows;
+    replay rows come from the parent's training split only. The parent is
+    re-scored on the same holdout for the tolerance check.
+    """
+    mode = mode.upper()
+    feature_set = FEATURE_SETS[mode]
+    tag = mode.lower()
+    parent_path = ARTIFACTS / f"rf_{tag}_{parent}.joblib"
+    with open(parent_path.with_suffix(".meta.json"), encoding="utf-8") as f:
+        parent_meta = json.load(f)
+
+    version = next_version(parent_meta["version"])
+    model_path = ARTIFACTS / f"rf_{tag}_{version}.joblib"
+    existing = [p for p in (model_path, model_path.with_suffix(".flat"), model_path.with_suffix(".meta.json"))
+                if p.exists()]
+    if existing and not force:
+        raise FileExistsError(f"{', '.join(map(str, existing))} already exist; use force=True (--force) to overwrite")
+
+    base = clean_data(load_raw_data(base_csv))
+    new = clean_data(read_csv_typed(new_csv))
+
+    base_train_X, base_test_X, base_train_y, base_test_y = split_data(base[feature_set], base[TARGET])
+    new_train_X, new_test_X, new_train_y, new_test_y = split_data(new[feature_set], new[TARGET])
+    X_test = pd.concat([base_test_X, new_test_X])
+    y_test = pd.concat([base_test_y, new_test_y])
+
+    parent_model = joblib.load(parent_path)
+    start = time.perf_counter()
+    model, info = incremental_fit(
+        parent_model, new_train_X, new_train_y, base_train_X, base_train_y,
+        on_unseen=on_unseen
+    )
+    info["train_seconds"] = round(time.perf_counter() - start, 2)
+
+    metrics = holdout_metrics(model, X_test, y_test)
+    # the parent's stored metrics are on its own holdout, without the new rows
+    parent_metrics = holdout_metrics(parent_model, X_test, y_test)
+
+    meta = dict(
+        parent_meta,
+        metrics_holdout=metrics,
+        notes=f"Incremental warm-start retrain of rf_{tag}_{parent} on {Path(new_csv).name}.",
+        version=version,
+        lineage={
+            "parent": f"rf_{tag}_{parent}",
+            "parent_version": parent_meta["version"],
+            "parent_metrics_holdout": parent_meta["metrics_holdout"],
+            "parent_metrics_same_holdout": parent_metrics,
+            "new_data": str(new_csv),
+            "mae_tolerance": MAE_TOLERANCE,
+            "within_tolerance": bool(metrics["MAE"] <= parent_metrics["MAE"] * (1 + MAE_TOLERANCE)),
+            **info,
+        }
+    )
+
+    save_artifacts(model, meta, model_path, model_path.with_suffix(".meta.json"))
+    return model_path, meta
+
+
+def simulate(mode="STRICT", n_new=500, n_estimators=300):
+    """
+    Compare incremental retraining against a full refit on co2.csv: `n_new`
+    random rows play the newly arrived vehicles, the rest the existing data.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+    from src.features.build_features import build_preprocessor
+    from src.features.build_features import get_feature_types
+
+    feature_set = FEATURE_SETS[mode]
+    df = clean_data(load_raw_data())
+    new = df.sample(n_new, random_state=7)
+    base = df.drop(new.index)
+
+    base_train_X, base_test_X, base_train_y, base_test_y = split_data(base[feature_set], base[TARGET])
+    new_train_X, new_test_X, new_train_y, new_test_y = split_data(new[feature_set], new[TARGET])
+    X_test = pd.concat([base_test_X, new_test_X])
+    y_test = pd.concat([base_test_y, new_test_y])
+
+    num_cols, cat_cols = get_feature_types(df, feature_set)
+
+    def fit_full(X, y):
+        pipe = Pipeline(steps=[
+            ("preprocessor", build_preprocessor(num_cols, cat_cols)),
+            ("model", RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1))
+        ])
+        return pipe.fit(X, y)
+
+    parent = fit_full(base_train_X, base_train_y)
+
+    start = time.perf_counter()
+    full = fit_full(pd.concat([base_train_X, new_train_X]), pd.concat([base_train_y, new_train_y]))
+    full_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    incremental, info = incremental_fit(
+        parent, new_train_X, new_train_y, base_train_X, base_train_y, on_unseen="ignore"
+    )
+    inc_s = time.perf_counter() - start
+
+    full_mae = holdout_metrics(full, X_test, y_test)["MAE"]
+    inc_mae = holdout_metrics(incremental, X_test, y_test)["MAE"]
+    new_full = mean_absolute_error(new_test_y, full.predict(new_test_X))
+    new_inc = mean_absolute_error(new_test_y, incremental.predict(new_test_X))
+
+    print(f"\n===== {mode} | {len(new_train_X)} new training rows, {info['replay_rows']} replayed =====")
+    print(f"full refit  : {full_s:6.2f}s | holdout MAE {full_mae:.4f} | new-rows MAE {new_full:.4f}")
+    print(f"incremental : {inc_s:6.2f}s | holdout MAE {inc_mae:.4f} | new-rows MAE {new_inc:.4f}")
+    print(f"speedup x{full_s / inc_s:.1f} | MAE change {100 * (inc_mae / full_mae - 1):+.2f}% "
+          f"(tolerance {100 * MAE_TOLERANCE:.0f}%)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Warm-start incremental retraining of the RF models.")
+    parser.add_argument("new_csv", nargs="?", help="CSV with the newly arrived vehicles")
+    parser.add_argument("--mode", choices=["STRICT", "FULL"], default="STRICT")
+    parser.add_argument("--base", default="data/raw/co2.csv", help="Data the parent model was trained on")
+    parser.add_argument("--parent", default="v1", help="Parent artifact version")
+    parser.add_argument("--allow-unseen", action="store_true",
+                        help="Encode unseen categories as all zeros instead of failing")
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing next-version artifact")
+    parser.add_argument("--simulate", action="store_true", help="Benchmark vs a full refit on co2.csv")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.simulate or not args.new_csv:
+        for mode in ["STRICT", "FULL"]:
+            simulate(mode)
+    else:
+        path, meta = retrain(
+            args.mode, args.new_csv,
+            base_csv=args.base,
+            parent=args.parent,
+            on_unseen="ignore" if args.allow_unseen else "error",
+            force=args.force
+        )
+        print(f"Saved {path} (+ {path.with_suffix('.flat').name}/, {path.with_suffix('.meta.json').name})")
+        print("Holdout metrics:", meta["metrics_holdout"])
+        print("Lineage:", {k: v for k, v in meta["lineage"].items() if not k.startswith("parent_metrics")})
@@ -0,0 +1,190 @@
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from src.data.load_data import DTYPES
+from src.data.preprocess import FEATURE_SET_STRICT, FEATURE_SET_FULL
+from src.risk.risk_scoring import (
+    risk_category_from_co2_array, risk_score_from_co2_array, generate_reasons_batch
+)
+
+ARTIFACTS = Path("artifacts/models")
+
+REQUIRED_COLUMNS = {
+    "STRICT": FEATURE_SET_STRICT,
+    "FULL": FEATURE_SET_FULL,
+}
+
+
+def _chunk_dtype(column, dtype):
+    if dtype == "category":
+        return "string"
+    if dtype.startswith("int"):
+        return dtype.capitalize()
+    if column in FEATURE_SET_FULL:
+        return "float64"
+    return dtype
+
+
+# load_data.DTYPES for chunked reads: every chunk gets the same column types (and
+# so the same parquet schema) whatever its values. Categories are read as strings
+# (each chunk would get its own category set) and integers as nullable Int*,
+# so a missing value in a later chunk does not turn the column into float64.
+# Numeric model features are always float64, as /predict/*/batch parses them.
+CHUNK_DTYPES = {column: _chunk_dtype(column, dtype) for column, dtype in DTYPES.items()}
+
+
+def default_model_path(mode: str) -> Path:
+    return ARTIFACTS / f"rf_{mode.lower()}_v1.joblib"
+
+
+def validate_columns(columns, mode: str):
+    missing = [c for c in REQUIRED_COLUMNS[mode] if c not in columns]
+    if missing:
+        raise ValueError(f"Missing columns for {mode} mode: {missing}")
+
+
+def score_chunk(model, chunk: pd.DataFrame, mode: str, limit: float, with_reasons: bool = False):
+    """
+    Predict one chunk and add the same result columns as the dashboard batch
+    tab (co2_pred_g_km, risk_score, decision), all computed vectorized.
+    """
+    preds = model.predict(chunk[REQUIRED_COLUMNS[mode]])
+
+    out = chunk.copy()
+    # Python's round like the API (np.round can differ on ties such as 209.825)
+    out["co2_pred_g_km"] = [round(float(p), 2) for p in preds]
+    out["risk_score"] = risk_score_from_co2_array(preds, limit)
+    out["decision"] = risk_category_from_co2_array(preds, limit)
+    if with_reasons:
+        out["reasons"] = [" | ".join(r) for r in generate_reasons_batch(chunk, mode=mode)]
+    return out
+
+
+# ---- process pool: each worker loads the model once
+_WORKER_MODEL = None
+
+
+def _init_worker(model_path):
+    global _WORKER_MODEL
+    _WORKER_MODEL = joblib.load(model_path)
+    # one thread per worker process: the forests are saved with n_jobs=-1
+    forest = _WORKER_MODEL.named_steps["model"]
+    if hasattr(forest, "n_jobs"):
+        forest.set_params(n_jobs=1)
+
+
+def _score_in_worker(chunk, mode, limit, with_reasons):
+    return score_chunk(_WORKER_MODEL, chunk, mode, limit, with_reasons)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or parquet file (chosen by extension)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.parquet = self.path.suffix == ".parquet"
+        self._writer = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                # later chunks are cast to the first chunk's schema
+                table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def predict_csv(input_path, output_path, mode="STRICT", limit=200.0, model_path=None,
+                chunksize=50_000, workers=0, with_reasons=False):
+    """
+    Stream a fleet CSV through the STRICT or FULL model in fixed-size chunks.
+    Only `chunksize` rows (times the number of chunks in flight when workers > 0)
+    are held in memory, whatever the input size.
+    Returns the number of rows scored.
+    """
+    mode = mode.upper()
+    model_path = Path(model_path or default_model_path(mode))
+
+    # validate required columns once, from the header only
+    validate_columns(pd.read_csv(input_path, nrows=0).columns, mode)
+
+    model = joblib.load(model_path) if not workers else None
+    reader = pd.read_csv(input_path, chunksize=chunksize, dtype=CHUNK_DTYPES)
+    writer = ChunkWriter(output_path)
+
+    start = time.perf_counter()
+    n_rows = 0
+
+    def report(out):
+        nonlocal n_rows
+        writer.write(out)
+        n_rows += len(out)
+        elapsed = time.perf_counter() - start
+        print(f"{n_rows:>12,} rows | {elapsed:8.1f}s | {n_rows / elapsed:>10,.0f} rows/s", flush=True)
+
+    try:
+        if workers and workers > 0:
+            # parsing (main process) overlaps with inference (workers); results are written in order
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+                pending = deque()
+                for chunk in reader:
+                    pending.append(pool.submit(_score_in_worker, chunk, mode, limit, with_reasons))
+                    if len(pending) >= 2 * workers:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+        else:
+            for chunk in reader:
+                report(score_chunk(model, chunk, mode, limit, with_reasons))
+    finally:
+        writer.close()
+
+    return n_rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score a fleet CSV with the STRICT or FULL CO2 model.")
+    parser.add_argument("input", help="Input CSV with the model's feature columns")
+    parser.add_argument("output", help="Output .csv or .parquet")
+    parser.add_argument("--mode", choices=["STRICT", "FULL"], default="STRICT")
+    parser.add_argument("--limit", type=float, default=200.0, help="Vehicle risk limit (g/km)")
+    parser.add_argument("--model", default=None, help="Model artifact (default: rf_<mode>_v1.joblib)")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=0, help="Inference processes (0 = in-process)")
+    parser.add_argument("--reasons", action="store_true", help="Add a reasons column")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    n = predict_csv(
+        args.input, args.output,
+        mode=args.mode,
+        limit=args.limit,
+        model_path=args.model,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        with_reasons=args.reasons
+    )
+    print(f"\nScored {n:,} vehicles -> {args.output}")
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+STRICT_KEY_COLS = ["Make", "Vehicle Class", "Transmission", "Fuel Type", "Engine Size(L)", "Cylinders"]
+FUEL_COMB_COL = "Fuel Consumption Comb (L/100 km)"
+
+
+def normalize_row(row: dict, mode: str = "STRICT") -> dict:
+    """
+    Canonical form of a vehicle spec, used for cache / catalog keys only. FULL
+    fuel consumption is rounded to the dataset's 0.1 L/100 km precision.
+    """
+    out = {
+        "Make": str(row["Make"]),
+        "Vehicle Class": str(row["Vehicle Class"]),
+        "Transmission": str(row["Transmission"]),
+        "Fuel Type": str(row["Fuel Type"]),
+        "Engine Size(L)": float(row["Engine Size(L)"]),
+        "Cylinders": int(row["Cylinders"]),
+    }
+    if mode.upper() == "FULL":
+        out[FUEL_COMB_COL] = round(float(row[FUEL_COMB_COL]), 1)
+    return out
+
+
+def cache_key(row: dict, mode: str = "STRICT") -> tuple:
+    """Hashable key of an already normalized row."""
+    key = tuple(row[c] for c in STRICT_KEY_COLS)
+    if mode.upper() == "FULL":
+        key += (row[FUEL_COMB_COL],)
+    return key
+
+
+def served_files(model_path: Path, mmap: bool = False) -> list:
+    """
+    The files load_compiled_pipeline reads for `model_path`: the .flat/ export
+    (arrays, forest.json, preprocessor.joblib) when mmap is on and it exists,
+    otherwise the joblib file (or the .flat/ export when only that exists).
+    """
+    model_path = Path(model_path)
+    directory = model_path.with_suffix(".flat")
+    if (mmap and directory.exists()) or not model_path.exists():
+        return sorted(p for p in directory.iterdir() if p.is_file())
+    return [model_path]
+
+
+def row_key(row: dict, mode: str = "STRICT"):
+    """
+    cache_key of a raw vehicle row, or None when normalizing would change the
+    value the model sees (FULL fuel consumption finer than 0.1 L/100 km). Such
+    rows bypass the cache and the catalog table, so a hit is always the value
+    live inference gives for the same input.
+    """
+    normalized = normalize_row(row, mode)
+    if mode.upper() == "FULL" and normalized[FUEL_COMB_COL] != float(row[FUEL_COMB_COL]):
+        return None
+    return cache_key(normalized, mode)
+
+
+def artifact_version(model_path: Path, mmap: bool = False) -> str:
+    """
+    Identifies the loaded model: meta.json version + the newest mtime of the
+    files it is served from, so a retrained file (or a regenerated .flat/
+    export) under the same name still invalidates cached predictions.
+    """
+    model_path = Path(model_path)
+    meta_path = model_path.with_suffix(".meta.json")
+    version = "unknown"
+    if meta_path.exists():
+        with open(meta_path, encoding="utf-8") as f:
+            version = json.load(f).get("version", version)
+    mtime = max(p.stat().st_mtime_ns for p in served_files(model_path, mmap))
+    return f"{model_path.stem}:{version}@{mtime}"
+
+
+def artifact_hash(model_path: Path, mmap: bool = False) -> str:
+    """
+    sha256 of the bytes of the files the model is served from (served_files).
+    Unlike artifact_version it changes exactly when the served model does,
+    whatever the meta.json says or the files' mtimes are.
+    """
+    h = hashlib.sha256()
+    for path in served_files(model_path, mmap):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU + TTL cache of model predictions keyed on a normalized
+    vehicle spec. The cache is cleared whenever it is queried with a model
+    version different from the one its entries were computed with.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key, version=None):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=None):
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, version=None):
+        value = self.get(key, version)
+        if value is None:
+            # computed outside the lock; concurrent misses on one key just compute twice
+            value = compute()
+            self.put(key, value, version)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def lookup_cached(cache: PredictionCache, model, row: dict, mode: str, catalog=None):
+    """
+    Catalog / cache half of cached_predict. Returns (co2_pred or None, key);
+    on a miss the caller predicts the raw row and, if key is not None, stores
+    it with cache.put(key, co2_pred, model.version).
+    """
+    key = row_key(row, mode)
+    if key is None:
+        return None, None
+    if catalog is not None:
+        co2_pred = catalog.lookup(key, mode)
+        if co2_pred is not None:
+            return co2_pred, key
+    return cache.get(key, model.version), key
+
+
+def cached_predict(cache: PredictionCache, model, row: dict, mode: str, catalog=None) -> float:
+    """
+    Predict one vehicle (CompiledPipeline) through the cache. The model always
+    sees the raw row; the normalized row is only the cache key (see row_key),
+    so cached and batch predictions of the same vehicle agree.
+    With a CatalogTable, known catalog specs are answered from the table first.
+    """
+    co2_pred, key = lookup_cached(cache, model, row, mode, catalog)
+    if co2_pred is None:
+        co2_pred = model.predict_row(row)
+        if key is not None:
+            cache.put(key, co2_pred, model.version)
+    return co2_pred
@@ -0,0 +1,94 @@
+import threading
+import time
+from pathlib import Path
+
+
+class ModelRegistry:
+    """
+    Serving models loaded on first use instead of at import time.
+
+    get() loads a model the first time it is asked for (other callers wait for
+    that load), warm_up() loads everything in a background thread so the server
+    can accept connections straight away, and status()/is_ready() back a
+    readiness probe. The model-loading stack (joblib, sklearn, pandas) is only
+    imported when the first model is loaded.
+    """
+
+    def __init__(self, artifacts_dir, names, mmap=True, n_jobs=None):
+        self.artifacts_dir = Path(artifacts_dir)
+        self.names = list(names)
+        self.mmap = mmap
+        # pin the forests' joblib n_jobs (saved as -1 in the artifacts) when serving from a pool
+        self.n_jobs = n_jobs
+        self._models = {}
+        self._errors = {}
+        self._load_seconds = {}
+        self._locks = {name: threading.Lock() for name in self.names}
+        self._warm_thread = None
+
+    def model_path(self, name: str) -> Path:
+        return self.artifacts_dir / f"{name}.joblib"
+
+    def get(self, name: str):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        if name not in self._locks:
+            raise KeyError(f"Unknown model: {name}")
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                from src.models.compiled_pipeline import load_compiled_pipeline
+
+                start = time.perf_counter()
+                try:
+                    model = load_compiled_pipeline(self.model_path(name), mmap=self.mmap)
+                    if self.n_jobs is not None and model.model is not None and hasattr(model.model, "n_jobs"):
+                        model.model.set_params(n_jobs=self.n_jobs)
+                except Exception as e:
+                    self._errors[name] = f"{type(e).__name__}: {e}"
+                    raise
+                self._load_seconds[name] = round(time.perf_counter() - start, 3)
+                self._errors.pop(name, None)
+                self._models[name] = model
+        return model
+
+    def _warm(self):
+        for name in self.names:
+            try:
+                self.get(name)
+            except Exception:
+                pass  # recorded in status(); the next get() retries
+
+    def warm_up(self, background: bool = True):
+        """Load every model, in a daemon thread by default."""
+        if not background:
+            self._warm()
+            return
+        if self._warm_thread is None or not self._warm_thread.is_alive():
+            self._warm_thread = threading.Thread(target=self._warm, name="model-warmup", daemon=True)
+            self._warm_thread.start()
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def is_ready(self) -> bool:
+        return all(name in self._models for name in self.names)
+
+    def status(self) -> dict:
+        out = {}
+        for name in self.names:
+            if name in self._models:
+                out[name] = {
+                    "state": "loaded",
+                    "version": self._models[name].version,
+                    "load_seconds": self._load_seconds[name],
+                }
+            elif name in self._errors:
+                out[name] = {"state": "error", "error": self._errors[name]}
+            elif self._locks[name].locked():
+                out[name] = {"state": "loading"}
+            else:
+                out[name] = {"state": "not_loaded"}
+        return out
@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+
+import joblib
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+
+from src.data.catalog import load_catalog
+from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
+from src.features.build_features import build_preprocessor, get_feature_types
+from src.models.catalog_table import CatalogTable, build_catalog_table
+from src.models.compiled_pipeline import export_serving_artifacts, load_compiled_pipeline, serving_dir
+from src.models.prediction_cache import artifact_hash, artifact_version
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "raw" / "co2.csv"
+
+
+def save_small_model(df, feature_set, path, random_state):
+    num_cols, cat_cols = get_feature_types(df, feature_set)
+    pipe = Pipeline(steps=[
+        ("preprocessor", build_preprocessor(num_cols, cat_cols)),
+        ("model", RandomForestRegressor(n_estimators=5, max_depth=6, random_state=random_state, n_jobs=1))
+    ]).fit(df[feature_set], df[TARGET])
+    joblib.dump(pipe, path)
+    # same meta version before and after the "retrain", as save_final_models writes it
+    with open(path.with_suffix(".meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": "v1"}, f)
+    return pipe
+
+
+def test_catalog_table_rejected_after_retrain(tmp_path):
+    df = clean_data(pd.read_csv(DATA_PATH))
+    catalog = load_catalog(DATA_PATH).head(200)
+    paths = {"STRICT": tmp_path / "rf_strict_v1.joblib", "FULL": tmp_path / "rf_full_v1.joblib"}
+    models = {
+        mode: save_small_model(df, feature_set, paths[mode], random_state=0)
+        for mode, feature_set in [("STRICT", FEATURE_SET_STRICT), ("FULL", FEATURE_SET_FULL)]
+    }
+
+    table = CatalogTable(build_catalog_table(
+        models["STRICT"], models["FULL"], catalog,
+        versions={mode: artifact_version(p) for mode, p in paths.items()},
+        hashes={mode: artifact_hash(p) for mode, p in paths.items()}
+    ))
+    for mode, path in paths.items():
+        assert table.matches(mode, load_compiled_pipeline(path, mmap=False))
+
+    # retrain STRICT under the same name and meta version
+    save_small_model(df, FEATURE_SET_STRICT, paths["STRICT"], random_state=1)
+    assert not table.matches("STRICT", load_compiled_pipeline(paths["STRICT"], mmap=False))
+    assert table.matches("FULL", load_compiled_pipeline(paths["FULL"], mmap=False))
+
+    # tables without stored hashes are never used
+    unhashed = CatalogTable(build_catalog_table(
+        models["STRICT"], models["FULL"], catalog,
+        versions={mode: artifact_version(p) for mode, p in paths.items()}
+    ))
+    assert not unhashed.matches("FULL", load_compiled_pipeline(paths["FULL"], mmap=False))
+
+
+def test_flat_export_hashed_when_served(tmp_path):
+    df = clean_data(pd.read_csv(DATA_PATH))
+    catalog = load_catalog(DATA_PATH).head(200)
+    strict_path, path = tmp_path / "rf_strict_v1.joblib", tmp_path / "rf_full_v1.joblib"
+    strict = save_small_model(df, FEATURE_SET_STRICT, strict_path, random_state=0)
+    pipe = save_small_model(df, FEATURE_SET_FULL, path, random_state=0)
+    export_serving_artifacts(pipe, serving_dir(path))
+
+    served = load_compiled_pipeline(path, mmap=True)
+    assert served.model is None
+    assert served.content_hash == artifact_hash(path, mmap=True) != artifact_hash(path)
+    table = CatalogTable(build_catalog_table(
+        strict, served, catalog,
+        versions={"STRICT": artifact_version(strict_path), "FULL": served.version},
+        hashes={"STRICT": artifact_hash(strict_path), "FULL": served.content_hash}
+    ))
+    assert table.matches("FULL", load_compiled_pipeline(path, mmap=True))
+
+    # regenerate the .flat/ export from another forest next to the unchanged joblib
+    other = save_small_model(df, FEATURE_SET_FULL, tmp_path / "other.joblib", random_state=1)
+    export_serving_artifacts(other, serving_dir(path))
+    reloaded = load_compiled_pipeline(path, mmap=True)
+    assert not table.matches("FULL", reloaded)
+    assert reloaded.version != served.version
@@ -0,0 +1,156 @@
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+
+from src.data.preprocess import clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
+from src.features.build_features import build_preprocessor, get_feature_types
+from src.models.compiled_pipeline import compile_pipeline, export_serving_artifacts, load_compiled_pipeline
+from src.models.flat_forest import FlatForest
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "raw" / "co2.csv"
+
+
+def fit_small_pipeline(df, feature_set, **encoding):
+    num_cols, cat_cols = get_feature_types(df, feature_set)
+    pipe = Pipeline(steps=[
+        ("preprocessor", build_preprocessor(num_cols, cat_cols, **encoding)),
+        ("model", RandomForestRegressor(n_estimators=25, random_state=42, n_jobs=1))
+    ])
+    return pipe.fit(df[feature_set], df[TARGET])
+
+
+def test_flat_forest_matches_sklearn(tmp_path):
+    df = clean_data(pd.read_csv(DATA_PATH))
+
+    for feature_set in [FEATURE_SET_STRICT, FEATURE_SET_FULL]:
+        pipe = fit_small_pipeline(df, feature_set)
+        forest = pipe.named_steps["model"]
+        flat = FlatForest.from_forest(forest)
+
+        X = pipe.named_steps["preprocessor"].transform(df[feature_set])
+        assert np.array_equal(flat.predict(X), forest.predict(X))
+        assert np.array_equal(flat.predict(X[:1]), forest.predict(X[:1]))
+        assert np.array_equal(flat.predict(X, chunk_size=100), forest.predict(X))
+
+        flat.save(tmp_path / "forest")
+        mapped = FlatForest.load(tmp_path / "forest", mmap_mode="r")
+        assert np.array_equal(mapped.predict(X), forest.predict(X))
+
+
+def test_predict_interval_matches_per_estimator():
+    df = clean_data(pd.read_csv(DATA_PATH))
+    pipe = fit_small_pipeline(df, FEATURE_SET_STRICT)
+    forest = pipe.named_steps["model"]
+    X = pipe.named_steps["preprocessor"].transform(df[FEATURE_SET_STRICT].iloc[:300])
+
+    mean, std, q = FlatForest.from_forest(forest).predict_interval(X, chunk_size=100)
+    per_tree = np.stack([tree.predict(X) for tree in forest.estimators_], axis=1)
+    assert np.array_equal(mean, forest.predict(X))
+    assert np.allclose(std, per_tree.std(axis=1))
+    assert np.allclose(q, np.quantile(per_tree, [0.1, 0.9], axis=1).T)
+
+
+def test_compiled_pipeline_matches_pipeline():
+    df = clean_data(pd.read_csv(DATA_PATH))
+
+    for feature_set in [FEATURE_SET_STRICT, FEATURE_SET_FULL]:
+        pipe = fit_small_pipeline(df, feature_set)
+        compiled = compile_pipeline(pipe)
+
+        rows = df[feature_set].sample(50, random_state=0).to_dict("records")
+        rows.append(dict(rows[0], Make="NOT-A-MAKE"))
+
+        expected = pipe.predict(pd.DataFrame(rows))
+        got = np.array([compiled.predict_row(r) for r in rows])
+        assert np.array_equal(got, expected)
+
+
+def test_compiled_pipeline_encodings(tmp_path):
+    df = clean_data(pd.read_csv(DATA_PATH))
+    rows = df[FEATURE_SET_FULL].sample(200, random_state=1).to_dict("records")
+    rows.append(dict(rows[0], Make="NOT-A-MAKE"))
+    rows.append(dict(rows[1], Make="BUGATTI", Transmission="A4"))  # rare -> infrequent group
+
+    for i, encoding in enumerate([
+        {"sparse": True},
+        {"sparse": True, "min_frequency": 20},
+        {"encoding": "ordinal"},
+        {"encoding": "ordinal", "max_categories": 10},
+    ]):
+        pipe = fit_small_pipeline(df, FEATURE_SET_FULL, **encoding)
+        compiled = compile_pipeline(pipe)
+
+        Xt = pipe.named_steps["preprocessor"].transform(pd.DataFrame(rows))
+        Xt = Xt.toarray() if hasattr(Xt, "toarray") else Xt
+        assert np.array_equal(compiled.encode_rows(rows), Xt)
+
+        expected = pipe.predict(pd.DataFrame(rows))
+        assert np.array_equal(compiled.predict_rows(rows), expected)
+        assert np.array_equal(np.array([compiled.predict_row(r) for r in rows]), expected)
+
+        # DataFrame paths hand the preprocessor's (possibly CSR) output to FlatForest;
+        # the .flat reload has no sklearn model, so predict() goes through it too
+        model_path = tmp_path / f"rf_{i}.joblib"
+        joblib.dump(pipe, model_path)
+        export_serving_artifacts(pipe, model_path.with_suffix(".flat"))
+        mapped = load_compiled_pipeline(model_path, mmap=True)
+        assert mapped.model is None
+
+        frame = pd.DataFrame(rows)
+        interval_rows = compiled.predict_interval_rows(rows)
+        bias_rows, contrib_rows = compiled.attribute_rows(rows)
+        for served in [compiled, mapped]:
+            assert np.array_equal(served.predict(frame), expected)
+            for got, want in zip(served.predict_interval(frame), interval_rows):
+                assert np.array_equal(got, want)
+            bias, contrib = served.attribute(frame)
+            assert bias == bias_rows and np.array_equal(contrib, contrib_rows)
+
+
+def test_compiled_pipeline_hist_gbm():
+    df = clean_data(pd.read_csv(DATA_PATH))
+    num_cols, cat_cols = get_feature_types(df, FEATURE_SET_FULL)
+    pipe = Pipeline(steps=[
+        ("preprocessor", build_preprocessor(num_cols, cat_cols, encoding="ordinal")),
+        ("model", HistGradientBoostingRegressor(
+            categorical_features=list(range(len(num_cols), len(num_cols) + len(cat_cols))),
+            max_iter=50, random_state=42
+        ))
+    ]).fit(df[FEATURE_SET_FULL], df[TARGET])
+    compiled = compile_pipeline(pipe)
+    assert compiled.flat is None
+
+    rows = df[FEATURE_SET_FULL].sample(100, random_state=2).to_dict("records")
+    rows.append(dict(rows[0], Make="NOT-A-MAKE"))  # -1 code -> treated as missing
+
+    expected = pipe.predict(pd.DataFrame(rows))
+    assert np.array_equal(compiled.predict_rows(rows), expected)
+    assert np.array_equal(np.array([compiled.predict_row(r) for r in rows]), expected)
+
+
+def test_attributions_match_decision_paths():
+    df = clean_data(pd.read_csv(DATA_PATH))
+    rows = df[FEATURE_SET_FULL].sample(50, random_state=3).to_dict("records")
+    rows.append(dict(rows[0], Make="NOT-A-MAKE"))
+
+    for encoding in [{}, {"encoding": "ordinal"}]:
+        pipe = fit_small_pipeline(df, FEATURE_SET_FULL, **encoding)
+        compiled = compile_pipeline(pipe)
+        bias, contrib = compiled.attribute_rows(rows)
+        assert contrib.shape == (len(rows), len(FEATURE_SET_FULL))
+        assert np.allclose(bias + contrib.sum(axis=1), compiled.predict_rows(rows))
+
+        # brute force for the last row: walk each tree's decision_path
+        X = compiled.encode_rows(rows[-1:])
+        expected = np.zeros(len(compiled.input_features))
+        for tree in pipe.named_steps["model"].estimators_:
+            path = tree.decision_path(X.astype(np.float32)).indices
+            values = tree.tree_.value.reshape(-1)
+            for parent, child in zip(path[:-1], path[1:]):
+                expected[compiled.column_feature[tree.tree_.feature[parent]]] += values[child] - values[parent]
+        expected /= len(pipe.named_steps["model"].estimators_)
+        assert np.allclose(contrib[-1], expected)
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+
+from src.data.preprocess import clean_data, FEATURE_SET_FULL, TARGET
+from src.features.build_features import build_preprocessor, get_feature_types
+from src.models import prediction_cache
+from src.models.compiled_pipeline import compile_pipeline
+from src.models.prediction_cache import FUEL_COMB_COL, PredictionCache, cached_predict, row_key
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "raw" / "co2.csv"
+
+
+def test_lru_eviction():
+    cache = PredictionCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", 1.0)
+    cache.put("b", 2.0)
+    assert cache.get("a") == 1.0    # "a" is now the most recently used
+    cache.put("c", 3.0)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1.0 and cache.get("c") == 3.0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now[0])
+    cache = PredictionCache(max_entries=10, ttl_seconds=60)
+    cache.put("a", 1.0)
+
+    now[0] += 59
+    assert cache.get("a") == 1.0
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_version_invalidation():
+    cache = PredictionCache(max_entries=10, ttl_seconds=0)
+    cache.put("a", 1.0, version="m:v1@1")
+    assert cache.get("a", version="m:v1@1") == 1.0
+
+    assert cache.get("a", version="m:v1@2") is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["version"] == "m:v1@2"
+
+
+def test_cache_hit_equals_live_prediction():
+    df = clean_data(pd.read_csv(DATA_PATH))
+    num_cols, cat_cols = get_feature_types(df, FEATURE_SET_FULL)
+    pipe = Pipeline(steps=[
+        ("preprocessor", build_preprocessor(num_cols, cat_cols)),
+        ("model", RandomForestRegressor(n_estimators=10, random_state=42, n_jobs=1))
+    ]).fit(df[FEATURE_SET_FULL], df[TARGET])
+    model = compile_pipeline(pipe, version="rf_full_v1:v1@1")
+    cache = PredictionCache(max_entries=100, ttl_seconds=0)
+
+    rows = df[FEATURE_SET_FULL].head(50).to_dict("records")
+    live = [model.predict_row(r) for r in rows]
+    assert [cached_predict(cache, model, r, "FULL") for r in rows] == live    # misses (+ repeated specs)
+    hits = cache.stats()["hits"]
+    assert [cached_predict(cache, model, r, "FULL") for r in rows] == live    # all hits
+    assert cache.stats()["hits"] == hits + len(rows)
+
+    # finer than the key's 0.1 L/100 km: never cached, always the live value
+    row = dict(rows[0], **{FUEL_COMB_COL: rows[0][FUEL_COMB_COL] + 0.06})
+    assert row_key(row, "FULL") is None
+    assert cached_predict(cache, model, row, "FULL") == model.predict_row(row)
+    assert cached_predict(cache, model, row, "FULL") == pipe.predict(pd.DataFrame([row]))[0]
@@ -1,60 +1,65 @@
-import pandas as pd
-from sklearn.pipeline import Pipeline
-from sklearn.model_selection import GridSearchCV
+import sys
 
 from sklearn.ensemble import RandomForestRegressor
 
-from src.data.preprocess import (
-    clean_data, FEATURE_SET_STRICT, FEATURE_SET_FULL, TARGET
-)
-from src.features.build_features import build_preprocessor
-
-
-def get_feature_types(df, feature_set):
-    numeric = [c for c in feature_set if df[c].dtype != "object"]
-    categorical = [c for c in feature_set if df[c].dtype == "object"]
-    return numeric, categorical
-
-
-def tune_rf(df, feature_set, title="MODEL"):
-    X = df[feature_set]
-    y = df[TARGET]
-
-    num_cols, cat_cols = get_feature_types(df, feature_set)
-    preprocessor = build_preprocessor(num_cols, cat_cols)
-
-    pipe = Pipeline(steps=[
-        ("preprocessor", preprocessor),
-        ("model", RandomForestRegressor(random_state=42))
-    ])
-
-    param_grid = {
-        "model__n_estimators": [200, 300],
-        "model__max_depth": [None, 15, 25],
-        "model__min_samples_split": [2, 5],
-        "model__min_samples_leaf": [1, 2]
-    }
-
-    grid = GridSearchCV(
-        pipe,
-        param_grid,
-        cv=5,
-        scoring="neg_mean_absolute_error",
-        n_jobs=-1
-    )
-
-    grid.fit(X, y)
-
-    print(f"\n===== {title} RANDOM FOREST TUNING =====")
-    print("Best MAE:", -grid.best_score_)
-    print("Best Params:", grid.best_params_)
-
-    return grid.best_estimator_
+from src.features.feature_store import load_design
+from src.models.cv_engine import grid_search, halving_search, default_cv
+
+
+# same search space for both modes; "halving" treats n_estimators as the budget
+PARAM_GRID = {
+    "n_estimators": [200, 300],
+    "max_depth": [None, 15, 25],
+    "min_samples_split": [2, 5],
+    "min_samples_leaf": [1, 2]
+}
+
+
+def tune_rf(design, title="MODEL", n_jobs=-1, method="grid"):
+    """
+    method="grid": exhaustive search over PARAM_GRID (GridSearchCV equivalent).
+    method="halving": successive halving, growing warm-started forests from 25
+    trees up to max(PARAM_GRID n_estimators) for the surviving configs only,
+    stopping early once MAE stops improving.
+    """
+    # same 5 unshuffled folds as GridSearchCV(cv=5), encoded once from the feature
+    # store (design); every (grid point, fold) job runs on one pool
+    folds = design.folds(default_cv(shuffle=False))
+
+    if method == "halving":
+        space = {k: v for k, v in PARAM_GRID.items() if k != "n_estimators"}
+        best_params, best_mae, log = halving_search(
+            RandomForestRegressor(random_state=42),
+            space,
+            folds,
+            max_estimators=max(PARAM_GRID["n_estimators"]),
+            n_jobs=n_jobs
+        )
+    else:
+        best_params, best_mae, log = grid_search(
+            RandomForestRegressor(random_state=42),
+            PARAM_GRID,
+            folds,
+            n_jobs=n_jobs
+        )
+    cpu_s = sum(r["cpu_s"] for r in log)
+
+    print(f"\n===== {title} RANDOM FOREST TUNING ({method}) =====")
+    if method == "halving":
+        for r in log:
+            print(f" - {r['candidates']:>2} configs x {r['n_estimators']:>3} trees | "
+                  f"best MAE {r['best_MAE']:.4f} | {r['cpu_s']:.1f} CPU-s")
+    print("Best MAE:", best_mae)
+    print("Best Params:", {f"model__{k}": v for k, v in best_params.items()})
+    print(f"CPU-seconds: {cpu_s:.1f}")
+
+    # refit on all rows, like GridSearchCV(refit=True)
+    best_model = RandomForestRegressor(random_state=42, n_jobs=n_jobs, **best_params)
+    return design.fit(best_model)
 
 
 if __name__ == "__main__":
-    df = pd.read_csv("D:/ML_PROJECTS/co2-risk-platform/data/raw/co2.csv")
-    df = clean_data(df)
+    method = sys.argv[1] if len(sys.argv) > 1 else "grid"   # grid | halving
 
-    best_rf_strict = tune_rf(df, FEATURE_SET_STRICT, title="STRICT")
-    best_rf_full = tune_rf(df, FEATURE_SET_FULL, title="FULL")
\ No newline at end of file
+    best_rf_strict = tune_rf(load_design("STRICT"), title="STRICT", method=method)
+    best_rf_full = tune_rf(load_design("FULL"), title="FULL", method=method)
\ No newline at end of file
@@ -1,3 +1,8 @@
+import math
+
+import numpy as np
+
+
 def risk_category_from_co2(co2_g_km: float, limit: float = 200.0):
     """
     Compliance-style categories.
@@ -56,6 +61,152 @@ def generate_reasons(input_row: dict, mode: str = "STRICT"):
         reasons.append("Emissions are mainly influenced by engine and efficiency-related factors.")
     return reasons[:3]
 
+
+def risk_category_from_co2_array(co2_g_km, limit=200.0):
+    """
+    Vectorized risk_category_from_co2 for many predictions at once.
+    Returns a NumPy array of PASS / AT_RISK / FAIL labels.
+    """
+    co2 = np.asarray(co2_g_km, dtype=float)
+    margin = 0.10 * limit  # 10% buffer
+    return np.select(
+        [co2 <= (limit - margin), co2 <= limit],
+        ["PASS", "AT_RISK"],
+        default="FAIL"
+    )
+
+
+def risk_score_from_co2_array(co2_g_km, limit=200.0):
+    """
+    Vectorized risk_score_from_co2 (0–100, 50 ~ around limit).
+    """
+    score = (np.asarray(co2_g_km, dtype=float) / limit) * 50
+    return np.clip(np.round(score, 1), 0, 100)
+
+
+REASON_TEXTS = {
+    "comb": "High combined fuel consumption is the main driver of CO₂ emissions.",
+    "engine": "Large engine size increases CO₂ emissions.",
+    "cylinders": "Higher cylinder count usually increases fuel use and CO₂.",
+    "class": "Vehicle class (SUV/Van/Pickup) tends to have higher emissions.",
+    "fuel": "Fuel type affects CO₂ output (diesel/ethanol blends can differ).",
+}
+DEFAULT_REASON = "Emissions are mainly influenced by engine and efficiency-related factors."
+
+# Rules in the order generate_reasons emits them; bit i of a reason code = rule i fired
+REASON_RULES = {
+    "STRICT": ["engine", "cylinders", "class"],
+    "FULL": ["comb", "engine", "cylinders", "class", "fuel"],
+}
+
+
+def _column(rows, name):
+    if name not in rows:
+        return None
+    return np.asarray(rows[name])
+
+
+def _rule_masks(rows):
+    n = len(rows)
+    no = np.zeros(n, dtype=bool)
+
+    eng = _column(rows, "Engine Size(L)")
+    cyl = _column(rows, "Cylinders")
+    vclass = _column(rows, "Vehicle Class")
+    fuel_type = _column(rows, "Fuel Type")
+    comb = _column(rows, "Fuel Consumption Comb (L/100 km)")
+
+    if vclass is not None:
+        vclass = vclass.astype(str)
+        vclass_mask = (
+            (np.char.find(vclass, "SUV") >= 0)
+            | (np.char.find(vclass, "VAN") >= 0)
+            | (np.char.find(vclass, "PICKUP") >= 0)
+        )
+    else:
+        vclass_mask = no
+
+    return {
+        "comb": no if comb is None else comb.astype(float) >= 9.0,
+        "engine": no if eng is None else eng.astype(float) >= 3.0,
+        "cylinders": no if cyl is None else cyl.astype(float) >= 6,
+        "class": vclass_mask,
+        "fuel": no if fuel_type is None else np.isin(fuel_type, ["D", "E"]),
+    }
+
+
+def reason_codes(rows, mode: str = "STRICT"):
+    """
+    Compact form of generate_reasons for a pandas DataFrame of vehicles:
+    one uint8 bitmask per row of the rules that fired (see REASON_RULES).
+    Each rule is evaluated once as a boolean mask over all rows.
+    """
+    masks = _rule_masks(rows)
+    codes = np.zeros(len(rows), dtype=np.uint8)
+    for bit, rule in enumerate(REASON_RULES[mode.upper()]):
+        codes |= masks[rule].astype(np.uint8) << bit
+    return codes
+
+
+def reasons_from_codes(codes, mode: str = "STRICT"):
+    """
+    Turn reason codes back into reason text (same ordering and 3-reason cap as
+    generate_reasons). Each distinct code is materialized only once.
+    """
+    rules = REASON_RULES[mode.upper()]
+    codes = np.asarray(codes)
+
+    texts = {}
+    for code in np.unique(codes):
+        reasons = [REASON_TEXTS[rule] for bit, rule in enumerate(rules) if code >> bit & 1]
+        if not reasons:
+            reasons.append(DEFAULT_REASON)
+        texts[code] = reasons[:3]
+
+    return [list(texts[code]) for code in codes]
+
+
+def generate_reasons_batch(rows, mode: str = "STRICT"):
+    """
+    Vectorized generate_reasons for a pandas DataFrame of vehicles.
+    Returns one list of reasons per row.
+    """
+    return reasons_from_codes(reason_codes(rows, mode), mode)
+
+
+# input feature -> wording used in attribution reasons
+FEATURE_LABELS = {
+    "Make": "Make",
+    "Vehicle Class": "Vehicle class",
+    "Transmission": "Transmission",
+    "Fuel Type": "Fuel type",
+    "Engine Size(L)": "Engine size",
+    "Cylinders": "Cylinder count",
+    "Fuel Consumption Comb (L/100 km)": "Combined fuel consumption",
+}
+
+
+def reasons_from_attributions(input_row: dict, contributions: dict, top_n: int = 3, min_g_km: float = 1.0):
+    """
+    Reasons from per-vehicle model attributions ({feature: g/km it moves the
+    prediction away from the training average}), largest effect first.
+    Effects under `min_g_km` are left out.
+    """
+    ranked = sorted(contributions.items(), key=lambda kv: -abs(kv[1]))
+    reasons = []
+    for feature, g_km in ranked[:top_n]:
+        if abs(g_km) < min_g_km:
+            break
+        label = FEATURE_LABELS.get(feature, feature)
+        direction = "raises" if g_km > 0 else "lowers"
+        reasons.append(
+            f"{label} ({input_row.get(feature)}) {direction} predicted CO₂ by {abs(g_km):.1f} g/km vs. the average vehicle."
+        )
+    if not reasons:
+        reasons.append(DEFAULT_REASON)
+    return reasons
+
+
 EU_TARGETS = {
     "EU_2020_2024": 95.0,
     "EU_2025_2029": 93.6,
@@ -70,14 +221,18 @@ def fleet_compliance_summary(co2_values, policy_key: str):
     """
     EU-style fleet average compliance
     """
+    avg_co2 = float(sum(co2_values) / len(co2_values))
+    return _compliance_from_average(avg_co2, len(co2_values), policy_key)
+
+
+def _compliance_from_average(avg_co2: float, n_vehicles: int, policy_key: str):
     target = EU_TARGETS[policy_key]
 
-    avg_co2 = float(sum(co2_values) / len(co2_values))
     excess = max(0.0, avg_co2 - target)
 
     compliant = excess == 0.0
 
-    penalty = excess * EU_PENALTY_PER_G * len(co2_values)
+    penalty = excess * EU_PENALTY_PER_G * n_vehicles
 
     return {
         "policy": policy_key,
@@ -87,3 +242,140 @@ def fleet_compliance_summary(co2_values, policy_key: str):
         "excess_g_km": round(excess, 2),
         "estimated_penalty_eur": round(penalty, 2)
     }
+
+
+def compliance_sweep(co2_values, limits, policies=None):
+    """
+    What-if analysis over one prediction vector:
+    - fleet_compliance_summary for every policy (default: all EU_TARGETS)
+    - PASS / AT_RISK / FAIL counts (as risk_category_from_co2) for every limit
+    Predictions are sorted once and every limit is answered with searchsorted,
+    so the cost is O(n log n + k) instead of O(n * k).
+    """
+    co2 = np.sort(np.asarray(co2_values, dtype=float))
+    if co2.size == 0:
+        raise ValueError("No CO2 values given")
+    limits = np.asarray(limits, dtype=float)
+    policies = list(EU_TARGETS) if policies is None else list(policies)
+
+    avg_co2 = math.fsum(co2) / co2.size
+    margin = 0.10 * limits  # 10% buffer, same as risk_category_from_co2
+    n_pass = np.searchsorted(co2, limits - margin, side="right")
+    n_within = np.searchsorted(co2, limits, side="right")
+
+    return {
+        "vehicles": int(co2.size),
+        "policies": {key: _compliance_from_average(avg_co2, co2.size, key) for key in policies},
+        "limits": [
+            {
+                "limit_g_km": float(limit),
+                "PASS": int(p),
+                "AT_RISK": int(w - p),
+                "FAIL": int(co2.size - w),
+            }
+            for limit, p, w in zip(limits, n_pass, n_within)
+        ],
+    }
+
+
+class _RunningSum:
+    """Count + Neumaier-compensated sum; chunk sums use math.fsum."""
+
+    __slots__ = ("count", "total", "compensation")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def add(self, value: float, count: int = 0):
+        t = self.total + value
+        if abs(self.total) >= abs(value):
+            self.compensation += (self.total - t) + value
+        else:
+            self.compensation += (value - t) + self.total
+        self.total = t
+        self.count += count
+
+    def merge(self, other):
+        self.add(other.total, other.count)
+        self.add(other.compensation)
+
+    @property
+    def mean(self) -> float:
+        return (self.total + self.compensation) / self.count
+
+
+class FleetComplianceAggregator:
+    """
+    Incremental version of fleet_compliance_summary for fleets that do not fit
+    in one list: feed predictions chunk by chunk with update(), combine partial
+    results from several workers with merge(), then call summary() for any
+    EU_TARGETS policy. Optional Make / Vehicle Class labels give per-group
+    breakdowns; every chunk must carry the same label lists as the first one,
+    otherwise the breakdowns would only cover part of the fleet.
+    """
+
+    GROUPS = ("Make", "Vehicle Class")
+
+    def __init__(self):
+        self.fleet = _RunningSum()
+        self.groups = {name: {} for name in self.GROUPS}
+        self.labelled = None    # label groups given with the first non-empty chunk
+
+    def _check_labels(self, labelled):
+        if self.labelled is None:
+            self.labelled = labelled
+        elif labelled != self.labelled:
+            expected = ", ".join(self.labelled) or "no labels"
+            raise ValueError(f"Every chunk must carry the same labels as the first one ({expected})")
+
+    @property
+    def count(self) -> int:
+        return self.fleet.count
+
+    def update(self, co2_values, makes=None, vehicle_classes=None):
+        co2 = np.asarray(co2_values, dtype=float)
+        grouped = []
+        for name, labels in zip(self.GROUPS, (makes, vehicle_classes)):
+            if labels is None:
+                continue
+            labels = np.asarray(labels).astype(str)
+            if labels.shape != co2.shape:
+                raise ValueError(f"{name} labels must have one entry per CO2 value")
+            grouped.append((name, labels))
+
+        if co2.size == 0:
+            return self
+        self._check_labels(tuple(name for name, _ in grouped))
+        self.fleet.add(math.fsum(co2), co2.size)
+
+        for name, labels in grouped:
+            values, inverse = np.unique(labels, return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.cumsum(np.bincount(inverse, minlength=len(values)))[:-1]
+            for value, group_co2 in zip(values, np.split(co2[order], bounds)):
+                self.groups[name].setdefault(value, _RunningSum()).add(math.fsum(group_co2), group_co2.size)
+        return self
+
+    def merge(self, other):
+        if other.labelled is not None:
+            self._check_labels(other.labelled)
+        self.fleet.merge(other.fleet)
+        for name in self.GROUPS:
+            for value, running in other.groups[name].items():
+                self.groups[name].setdefault(value, _RunningSum()).merge(running)
+        return self
+
+    def summary(self, policy_key: str):
+        """Same dict as fleet_compliance_summary over every value seen so far."""
+        if self.fleet.count == 0:
+            raise ValueError("No CO2 values have been added")
+        return _compliance_from_average(self.fleet.mean, self.fleet.count, policy_key)
+
+    def breakdown(self, policy_key: str, by: str = "Make"):
+        """fleet_compliance_summary per Make or Vehicle Class (plus vehicle count)."""
+        return {
+            value: dict(_compliance_from_average(running.mean, running.count, policy_key), vehicles=running.count)
+            for value, running in sorted(self.groups[by].items())
+        }
@@ -1,16 +1,107 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.preprocess import clean_data
 from src.risk.risk_scoring import risk_category_from_co2, risk_score_from_co2, generate_reasons
+from src.risk.risk_scoring import (
+    risk_category_from_co2_array, risk_score_from_co2_array, generate_reasons_batch
+)
+from src.risk.risk_scoring import (
+    EU_TARGETS, FleetComplianceAggregator, compliance_sweep, fleet_compliance_summary
+)
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "raw" / "co2.csv"
+
+
+def test_vectorized_matches_scalar():
+    raw = pd.read_csv(DATA_PATH)
+    rng = np.random.default_rng(0)
+    co2 = np.concatenate([raw["CO2 Emissions(g/km)"].to_numpy(dtype=float), rng.uniform(0, 500, 5000)])
+
+    for limit in [95.0, 200.0, 250.0]:
+        assert list(risk_score_from_co2_array(co2, limit)) == [risk_score_from_co2(v, limit) for v in co2]
+        assert list(risk_category_from_co2_array(co2, limit)) == [risk_category_from_co2(v, limit) for v in co2]
+
+    for df in [raw, clean_data(raw)]:
+        records = df.to_dict("records")
+        for mode in ["STRICT", "FULL"]:
+            assert generate_reasons_batch(df, mode) == [generate_reasons(r, mode) for r in records]
+
+
+def test_fleet_aggregator_matches_summary():
+    raw = pd.read_csv(DATA_PATH)
+    co2 = raw["CO2 Emissions(g/km)"].to_numpy(dtype=float)
+    makes = raw["Make"].to_numpy()
+    classes = raw["Vehicle Class"].to_numpy()
+
+    # two "workers" fed uneven chunks, then merged
+    parts = []
+    for lo, hi in [(0, 1000), (1000, len(co2))]:
+        agg = FleetComplianceAggregator()
+        for start in range(lo, hi, 333):
+            stop = min(start + 333, hi)
+            agg.update(co2[start:stop], makes[start:stop], classes[start:stop])
+        parts.append(agg)
+    merged = parts[0].merge(parts[1])
+
+    assert merged.count == len(co2)
+    for policy in EU_TARGETS:
+        assert merged.summary(policy) == fleet_compliance_summary(list(co2), policy)
+        for by, labels in [("Make", makes), ("Vehicle Class", classes)]:
+            groups = merged.breakdown(policy, by=by)
+            assert sum(g["vehicles"] for g in groups.values()) == len(co2)
+            for value, group in groups.items():
+                expected = fleet_compliance_summary(list(co2[labels == value]), policy)
+                assert group == dict(expected, vehicles=int((labels == value).sum()))
+
+    # a chunk without the first chunk's labels would leave the breakdown partial
+    with pytest.raises(ValueError):
+        FleetComplianceAggregator().update(co2[:2], makes[:2]).update(co2[2:4])
+    with pytest.raises(ValueError):
+        FleetComplianceAggregator().update(co2[:2]).merge(FleetComplianceAggregator().update(co2[2:4], makes[2:4]))
+
+
+def test_compliance_sweep_matches_per_limit():
+    raw = pd.read_csv(DATA_PATH)
+    rng = np.random.default_rng(1)
+    limits = [95.0, 120.0, 180.0, 200.0, 250.0]
+    # values exactly on every PASS / AT_RISK / FAIL boundary, in shuffled order
+    edges = [v for limit in limits for v in (limit - 0.10 * limit, limit)]
+    co2 = rng.permutation(np.concatenate([
+        raw["CO2 Emissions(g/km)"].to_numpy(dtype=float), rng.uniform(0, 500, 2000), edges
+    ]))
+
+    result = compliance_sweep(co2, limits)
+    assert result["vehicles"] == len(co2)
+    assert [row["limit_g_km"] for row in result["limits"]] == limits
+    for row in result["limits"]:
+        categories = risk_category_from_co2_array(co2, row["limit_g_km"])
+        for category in ["PASS", "AT_RISK", "FAIL"]:
+            assert row[category] == int((categories == category).sum())
+
+    assert list(result["policies"]) == list(EU_TARGETS)
+    for policy, summary in result["policies"].items():
+        assert summary == fleet_compliance_summary(list(co2), policy)
+
+    subset = compliance_sweep(co2, limits, policies=["EU_2030_2034"])
+    assert list(subset["policies"]) == ["EU_2030_2034"]
+
 
-sample = {
-    "Engine Size(L)": 3.5,
-    "Cylinders": 6,
-    "Vehicle Class": "SUV - STANDARD",
-    "Fuel Type": "X",
-    "Fuel Consumption Comb (L/100 km)": 10.2
-}
+if __name__ == "__main__":
+    sample = {
+        "Engine Size(L)": 3.5,
+        "Cylinders": 6,
+        "Vehicle Class": "SUV - STANDARD",
+        "Fuel Type": "X",
+        "Fuel Consumption Comb (L/100 km)": 10.2
+    }
 
-co2_pred = 230.0
+    co2_pred = 230.0
 
-print("Category:", risk_category_from_co2(co2_pred, limit=200))
-print("Score:", risk_score_from_co2(co2_pred, limit=200))
-print("Reasons STRICT:", generate_reasons(sample, mode="STRICT"))
-print("Reasons FULL:", generate_reasons(sample, mode="FULL"))
+    print("Category:", risk_category_from_co2(co2_pred, limit=200))
+    print("Score:", risk_score_from_co2(co2_pred, limit=200))
+    print("Reasons STRICT:", generate_reasons(sample, mode="STRICT"))
+    print("Reasons FULL:", generate_reasons(sample, mode="FULL"))
@@ -0,0 +1,231 @@
+import contextvars
+import cProfile
+import functools
+import inspect
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+# seconds; request latencies here range from ~0.1 ms (cache hits) to seconds (large batches)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# per-request state: {"start", "handler_end", "stages": {name: seconds}}
+_CURRENT = contextvars.ContextVar("co2_request", default=None)
+
+
+class Histogram:
+    """Prometheus-style histogram with one series per label tuple."""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}   # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, series in items:
+            label_str = ",".join(f'{n}="{v}"' for n, v in zip(self.label_names, labels))
+            cumulative = 0
+            for le, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_str},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_str}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{label_str}}} {cumulative}")
+        return lines
+
+
+class _Stage:
+    __slots__ = ("stages", "name", "start")
+
+    def __init__(self, stages, name):
+        self.stages = stages
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        # repeated stages in one request (e.g. several chunks) add up
+        self.stages[self.name] = self.stages.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+class _NoStage:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """
+    Time a block as stage `name` of the current API request. Outside a request
+    (scripts, dashboard, tests) this is a shared no-op context manager.
+    """
+    ctx = _CURRENT.get()
+    if ctx is None:
+        return _NO_STAGE
+    return _Stage(ctx["stages"], name)
+
+
+class RequestMetrics:
+    """
+    Per-endpoint request and stage latency histograms for the API, rendered in
+    the Prometheus text format, plus an optional sampling profiler.
+
+    Stages recorded for an instrumented endpoint:
+      validation - request start to handler entry (body read, JSON parsing,
+                   pydantic validation, threadpool dispatch)
+      the handler's own stage() blocks (dataframe, preprocess, predict, ...)
+      response   - handler exit to the last body byte (serialization, streaming)
+    """
+
+    def __init__(self, profile_every=0, profile_dir="artifacts/profiles", buckets=DEFAULT_BUCKETS):
+        self.requests = Histogram(
+            "co2_request_duration_seconds", "Request latency by endpoint.",
+            ["endpoint", "method", "status"], buckets
+        )
+        self.stages = Histogram(
+            "co2_stage_duration_seconds", "Time spent per request stage.",
+            ["endpoint", "stage"], buckets
+        )
+        self.profile_every = int(profile_every)
+        self.profile_dir = Path(profile_dir)
+        self._counter = itertools.count(1)
+        self._profiling = threading.Lock()
+
+    def begin(self):
+        ctx = {"start": time.perf_counter(), "handler_end": None, "stages": {}}
+        return ctx, _CURRENT.set(ctx)
+
+    def end(self, ctx, token, endpoint, method, status):
+        now = time.perf_counter()
+        _CURRENT.reset(token)
+        self.requests.observe((endpoint, method, str(status)), now - ctx["start"])
+        if ctx["handler_end"] is not None:
+            ctx["stages"]["response"] = now - ctx["handler_end"]
+        for name, seconds in ctx["stages"].items():
+            self.stages.observe((endpoint, name), seconds)
+
+    def instrument(self, fn):
+        """
+        Decorator for endpoint functions (sync or async): records the
+        validation and response stages and, when profiling is on, runs every
+        Nth call under cProfile and dumps the stats to profile_dir.
+        """
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                ctx = self._handler_start()
+                try:
+                    profiler = self._sampled_profiler()
+                    if profiler is None:
+                        return await fn(*args, **kwargs)
+                    # event-loop thread only: work awaited in worker threads is not included
+                    profiler.enable()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        profiler.disable()
+                        self._dump(profiler, fn)
+                finally:
+                    self._handler_end(ctx)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            ctx = self._handler_start()
+            try:
+                profiler = self._sampled_profiler()
+                if profiler is None:
+                    return fn(*args, **kwargs)
+                try:
+                    return profiler.runcall(fn, *args, **kwargs)
+                finally:
+                    self._dump(profiler, fn)
+            finally:
+                self._handler_end(ctx)
+
+        return wrapper
+
+    def _handler_start(self):
+        ctx = _CURRENT.get()
+        if ctx is not None:
+            ctx["stages"]["validation"] = time.perf_counter() - ctx["start"]
+        return ctx
+
+    def _handler_end(self, ctx):
+        if ctx is not None:
+            ctx["handler_end"] = time.perf_counter()
+
+    def _sampled_profiler(self):
+        # one profile at a time: overlapping cProfile sessions interfere
+        if not self.profile_every or next(self._counter) % self.profile_every:
+            return None
+        if not self._profiling.acquire(blocking=False):
+            return None
+        return cProfile.Profile()
+
+    def _dump(self, profiler, fn):
+        try:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            profiler.dump_stats(self.profile_dir / f"{fn.__name__}-{stamp}-{time.perf_counter_ns()}.prof")
+        finally:
+            self._profiling.release()
+
+    def render(self) -> str:
+        return "\n".join(self.requests.render() + self.stages.render()) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no extra task per request, unlike BaseHTTPMiddleware).
+    Endpoints are labelled by route template, so path parameters such as
+    session ids do not create new series.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        ctx, token = self.metrics.begin()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            self.metrics.end(ctx, token, endpoint, scope["method"], status)